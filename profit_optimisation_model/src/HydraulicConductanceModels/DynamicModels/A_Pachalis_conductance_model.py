@@ -9,9 +9,9 @@ https://pubmed.ncbi.nlm.nih.gov/37962234/
 from profit_optimisation_model.src.HydraulicConductanceModels.hydraulic_conductance_model import (
     HydraulicConductanceModel)
 from numpy import array as np_array
-from numpy import ndarray, float64
-from numpy import linspace, ones, zeros
-from numpy import clip
+from numpy import linspace, ones
+from numpy import clip, asarray, argsort, searchsorted, cumsum, concatenate
+from numpy import minimum, where, errstate, roll, power, arange, expm1, log1p
 
 class APachalisConductanceModel(HydraulicConductanceModel):
 
@@ -21,10 +21,23 @@ class APachalisConductanceModel(HydraulicConductanceModel):
     _growth_rate: float
     _turnover_rate: float
 
-    # Arrays to stor information on the xylem as a function of their age
+    # Arrays to stor information on the xylem as a function of their age. The conductance and population arrays are
+    # circular buffers with the youngest age group at the head index, followed by the older age groups.
     _xylem_conductance : np_array
     _xylem_population = np_array
     _xylem_age = np_array
+    _xylem_conductance_head: int
+    _xylem_population_head: int
+
+    # Time covered by the youngest age group, a new age group is started once it reaches the time step size
+    _time_in_youngest_age_group: float
+
+    # Maximum of the xylem conductance array and sum of the xylem population array, updated with the arrays
+    _xylem_conductance_maximum: float
+    _total_xylem_population: float
+
+    # Age groups sorted by conductance with cumulative sums, see _sorted_xylem_cumulative_sums
+    _xylem_cumulative_sums: tuple
 
     def __init__(self,
                  base_vulnerability_curve: HydraulicConductanceModel,
@@ -36,9 +49,10 @@ class APachalisConductanceModel(HydraulicConductanceModel):
         """
         @param base_vulnerability_curve: (HydraulicConductanceModel)
         @param num_ages: (int) Number of age groups to consider
-        @param time_step_size: (float) (s) Time step size for the model
-        @param growth_rate: (float) (s-1) Growth rate of new xylem
-        @param turnover_rate: (float) (s-1) Turnover rate of the xylem population
+        @param time_step_size: (float) (s) Width of the xylem age groups, independent of the model timestep
+        @param growth_rate: (float) (s-1) Population of new xylem grown per second, i.e. growth_rate * time_step_size
+                            per age group
+        @param turnover_rate: (float) (unitless) Fraction of the xylem population lost over the width of an age group
         """
 
         self._base_vulnerability_curve = base_vulnerability_curve
@@ -50,7 +64,9 @@ class APachalisConductanceModel(HydraulicConductanceModel):
         # Setup arrays to contain age information
         self._xylem_age = linspace(0, time_step_size*num_ages, num_ages)
         self._xylem_conductance = ones(num_ages) * base_vulnerability_curve.maximum_conductance
-        self._xylem_population = zeros(num_ages)
+        self._xylem_conductance_head = 0
+        self._xylem_conductance_maximum = base_vulnerability_curve.maximum_conductance
+        self._xylem_cumulative_sums = None
 
         self.initialise_xylem_population(growth_rate, turnover_rate)
 
@@ -63,120 +79,190 @@ class APachalisConductanceModel(HydraulicConductanceModel):
 
         """
         Calculate the conductance of the xylem given a water potential.
-        @param water_potential: (MPa)
+        @param water_potential: (MPa), float or numpy array
         @return: conductance (mmol m-2 s-1 MPa-1)
         """
 
-        if(type(water_potential) is float
-           or type(water_potential) is float64):
+        # Get the healthy xylem conductance imposed by the base vulnerability curve
+        current_maximum_conductance = self._base_vulnerability_curve.conductance(asarray(water_potential,
+                                                                                        dtype=float))
 
-            # Get the healthy xylem conductance imposed by the base vulnerability curve
-            current_maximum_conductance = self._base_vulnerability_curve.conductance(water_potential)
+        # Each xylem age group conducts the smaller of its own conductance and the current maximum conductance. With
+        # the age groups sorted by conductance those below the current maximum are found with a binary search and
+        # both parts of the sum come from prefix sums.
+        (sorted_xylem_conductance,
+         cumulative_xylem_conductance,
+         cumulative_xylem_population) = self._sorted_xylem_cumulative_sums()
 
-            # Produce a temporary xylem conductance array that is clipped to the current maximum conductance
-            tmp_xylem_conductance = clip(self._xylem_conductance, 0, current_maximum_conductance)
+        number_of_unclipped_ages = searchsorted(sorted_xylem_conductance, current_maximum_conductance, side='right')
 
-            # Return the sum of the conductance of all xylem
-            return sum(tmp_xylem_conductance * self._xylem_population)
+        return (cumulative_xylem_conductance[number_of_unclipped_ages]
+                + current_maximum_conductance * (cumulative_xylem_population[-1]
+                                                 - cumulative_xylem_population[number_of_unclipped_ages]))[()]
+
+    def _sorted_xylem_cumulative_sums(self):
+
+        """
+        Sorts the age groups by conductance and calculates the cumulative conductance and population. Only
+        recalculated after the xylem conductance or population change.
+        @return: sorted xylem conductance (mmol m-2 s-1 MPa-1)
+        @return: cumulative xylem conductance, starting from zero (mmol m-2 s-1 MPa-1)
+        @return: cumulative xylem population, starting from zero (unitless)
+        """
 
-        elif(isinstance(water_potential, ndarray)):
-            conductances = zeros(water_potential.shape)
+        if(self._xylem_cumulative_sums is None):
+            xylem_conductance = clip(self.xylem_conductivity, 0, None)
+            sorted_ids = argsort(xylem_conductance, kind='stable')
 
-            for i in range(len(water_potential)):
-                conductances[i] = self.conductance(water_potential[i])
+            sorted_xylem_conductance = xylem_conductance[sorted_ids]
+            sorted_xylem_population = self.xylem_population[sorted_ids]
 
-            return conductances
+            self._xylem_cumulative_sums = (sorted_xylem_conductance,
+                                           concatenate(([0.], cumsum(sorted_xylem_conductance
+                                                                     * sorted_xylem_population))),
+                                           concatenate(([0.], cumsum(sorted_xylem_population))))
 
-        else:
-            raise Exception("Invalid input type for water_potential, {}. Must be float or np.ndarray"
-                            .format(type(water_potential)))
+        return self._xylem_cumulative_sums
 
     def water_potential_from_conductivity_loss_fraction(self, conductivity_loss_fraction):
 
         """
-        Calculate the water potential given a conductivity loss fraction.
-        @param conductivity_loss_fraction: (unitless)
-        @return: (MPa)
+        Calculate the water potential given a conductivity loss fraction. As a function of the base vulnerability
+        curve conductance the xylem conductance is piecewise linear, with a node at each age group conductance, so it
+        is inverted exactly.
+        @param conductivity_loss_fraction: (unitless), float or numpy array
+        @return: (MPa), 0 where the loss fraction is below the current loss at zero water potential
         """
 
         # Calculate the conductance of the xylem given the conductivity loss fraction
-        target_conductance = conductivity_loss_fraction * self.maximum_conductance
+        target_conductance = (1 - asarray(conductivity_loss_fraction, dtype=float)) * self.maximum_conductance
 
-        # Water potential if all xylem were healthy
-        water_potential_healthy = (self._base_vulnerability_curve.water_potential_from_conductance(target_conductance)
-                       * self.total_xylem_popuation)
+        (sorted_xylem_conductance,
+         cumulative_xylem_conductance,
+         cumulative_xylem_population) = self._sorted_xylem_cumulative_sums()
 
-        # Step through water potentials, starting from psi_healthy, until the conductance is larger than the
-        # target conductance. The water potential at this point is the water potential at the target conductance.
-        N = 1000
-        for i in range(1, N):
-            # Calculate the current water potential
-            current_water_potential = water_potential_healthy * (1 - i/N)
+        # Xylem conductance when the base vulnerability curve conductance equals each age group conductance
+        population_above = cumulative_xylem_population[-1] - cumulative_xylem_population
+        node_conductance = cumulative_xylem_conductance[1:] + sorted_xylem_conductance * population_above[1:]
 
-            # calculate the current conductance
-            current_conductance = self.conductance(current_water_potential)
+        # Find the linear section containing the target and invert it to get the base curve conductance
+        section = searchsorted(node_conductance, target_conductance)
+        unreachable = section == len(node_conductance)
+        section = minimum(section, len(node_conductance) - 1)
 
-            # If the current conductance is larger than the target conductance, return the current water potential
-            if current_conductance > target_conductance + 1e-6:
-                return current_water_potential
+        with errstate(divide='ignore', invalid='ignore'):
+            base_conductance = ((target_conductance - cumulative_xylem_conductance[section])
+                                / population_above[section])
+        base_conductance = where(population_above[section] > 0,
+                                 base_conductance,
+                                 sorted_xylem_conductance[section])
 
-        return 0.0
+        unreachable |= base_conductance >= self._base_vulnerability_curve.maximum_conductance
 
-    def _update_xylem_conductance(self, current_psi, timestep):
+        with errstate(invalid='ignore'):
+            water_potential = self._base_vulnerability_curve.water_potential_from_conductance(base_conductance)
+
+        return where(unreachable, 0.0, water_potential)[()]
+
+    def _add_xylem_age_group(self, current_conductance):
 
         """
-        Update the conductance of the xylem as a function of age given a current water potential and timestep.
-        @param current_psi:
-        @param timestep:
+        Age the xylem by one age group. The oldest age group is replaced by a new, empty, youngest age group.
+        @param current_conductance: (mmol m-2 s-1 MPa-1) conductance of the new xylem
         """
 
-        if(timestep != self._time_step_size):
-            raise Exception("Timestep size does not match the model timestep size")
+        # Move the heads back one place, the oldest age group is replaced by the youngest
+        self._xylem_conductance_head = (self._xylem_conductance_head - 1) % self._num_ages
+        self._xylem_conductance[self._xylem_conductance_head] = current_conductance
 
-        # Get the current conductance from the base vulnerability curve and current water potential
-        current_conductance = self._base_vulnerability_curve.conductance(current_psi)
+        if(not current_conductance <= self._xylem_conductance_maximum):
+            self._xylem_conductance_maximum = current_conductance
+
+        self._xylem_population_head = (self._xylem_population_head - 1) % self._num_ages
+        self._total_xylem_population -= self._xylem_population[self._xylem_population_head]
+        self._xylem_population[self._xylem_population_head] = 0.
+
+        self._time_in_youngest_age_group = 0.
+
+        self._xylem_cumulative_sums = None
+
+    def _update_xylem_conductance(self, current_conductance, timestep):
 
-        # Clip those xylem ages that have a conductance higher than the current conductance
-        self._xylem_conductance = clip(self._xylem_conductance, 0, current_conductance)
+        """
+        Update the conductance of the xylem as a function of age given the current conductance of the base
+        vulnerability curve over a timestep within the youngest age group.
+        @param current_conductance: (mmol m-2 s-1 MPa-1)
+        @param timestep: (s)
+        """
+
+        # Clip those xylem ages that have a conductance higher than the current conductance. Nothing is clipped if
+        # the current conductance is at least the maximum of the array.
+        if(not current_conductance >= self._xylem_conductance_maximum):
+            clip(self._xylem_conductance, 0, current_conductance, out=self._xylem_conductance)
 
-        # Age the xylem by shifting the conductance values one age group
-        self._xylem_conductance[1:] = self._xylem_conductance[:-1]
-        self._xylem_conductance[0] = current_conductance
+            # All xylem conductance values are now at most the current conductance
+            self._xylem_conductance_maximum = current_conductance
+
+        self._xylem_cumulative_sums = None
 
     def _update_xylem_population(self, growth_rate, turnover_rate,  timestep):
 
         """
-        Update the xylem population as a function of age given a growth rate and turnover rate.
-        @param growth_rate:
-        @param turnover_rate:
-        @param timestep:
+        Update the xylem population as a function of age given a growth rate and turnover rate over a timestep within
+        the youngest age group. Turnover compounds over the timesteps, so a whole age group loses the turnover rate
+        fraction of the population and gains growth_rate * time_step_size, as if it was a single timestep,
+        whichever timesteps it is split into.
+        @param growth_rate: (s-1) population of new xylem grown per second
+        @param turnover_rate: (unitless) fraction of the population lost over the width of an age group
+        @param timestep: (s)
         """
 
-        if(timestep != self._time_step_size):
-            raise Exception("Timestep size does not match the model timestep size")
+        # Apply turnover to the entire population, (1 - turnover_fraction) = (1 - turnover_rate)^(timestep / width)
+        turnover_fraction = -expm1(log1p(-turnover_rate) * (timestep / self._time_step_size))
+        self._xylem_population -= self._xylem_population * turnover_fraction
+        self._total_xylem_population -= self._total_xylem_population * turnover_fraction
 
-        # Age the xylem population by shifting the population values one age group
-        self._xylem_population[1:] = self._xylem_population[:-1]
+        # Add the growth to the youngest xylem age group. The growth is scaled up by the turnover still to come in
+        # the age group, so the youngest age group holds growth_rate * time_step_size once it is complete.
+        remaining_time_in_age_group = (self._time_step_size
+                                       - min(self._time_in_youngest_age_group + timestep, self._time_step_size))
+        growth = growth_rate * timestep / power(1 - turnover_rate, remaining_time_in_age_group / self._time_step_size)
 
-        # Apply turnover to the entire population
-        self._xylem_population -= self._xylem_population * turnover_rate
+        self._xylem_population[self._xylem_population_head] += growth
+        self._total_xylem_population += growth
 
-        # Set the new population of the youngest xylem age group
-        self._xylem_population[0] = growth_rate * timestep
+        self._xylem_cumulative_sums = None
 
     def update_xylem_damage(self, water_potential, timestep, transpiration_rate, root_water_potential):
 
         """
         Update the xylem conductance and population given a current water potential, timestep and transpiration rate.
+        The timestep does not need to match the width of the age groups. Timesteps shorter than an age group are
+        accumulated into the youngest age group and longer timesteps are split at the age group boundaries.
         @param water_potential: (MPa)
         @param timestep: (s)
         @param transpiration_rate: (mmol m-2 s-1)
         @param root_water_potential: (MPa)
         """
 
-        # Update the xylem conductance and population
-        self._update_xylem_conductance(water_potential, timestep)
-        self._update_xylem_population(self._growth_rate, self._turnover_rate, timestep)
+        # Get the current conductance from the base vulnerability curve and current water potential
+        current_conductance = self._base_vulnerability_curve.conductance(water_potential)
+
+        remaining_time = timestep
+        while(remaining_time > timestep * 1e-9):
+
+            # Start a new age group once the youngest covers the full age group width
+            if(self._time_in_youngest_age_group >= self._time_step_size * (1 - 1e-9)):
+                self._add_xylem_age_group(current_conductance)
+
+            sub_step = min(remaining_time, self._time_step_size - self._time_in_youngest_age_group)
+
+            # Update the xylem conductance and population
+            self._update_xylem_conductance(current_conductance, sub_step)
+            self._update_xylem_population(self._growth_rate, self._turnover_rate, sub_step)
+
+            self._time_in_youngest_age_group += sub_step
+            remaining_time -= sub_step
 
         return True
 
@@ -188,14 +274,16 @@ class APachalisConductanceModel(HydraulicConductanceModel):
         @param initial_turnover_rate: (float) Initial turnover rate of the xylem population
         """
 
-        # Reset the xylem population and conductance arrays
-        self._xylem_population = zeros(self._num_ages)
+        # Steady state of _update_xylem_population, each age group is the growth of one time step reduced by
+        # turnover once for every time step of its age
+        self._xylem_population = (initial_growth_rate * self._time_step_size
+                                  * power(1 - initial_turnover_rate, arange(self._num_ages)))
+        self._xylem_population_head = 0
+        self._total_xylem_population = self._xylem_population.sum()
+        self._time_in_youngest_age_group = self._time_step_size
+        self._xylem_cumulative_sums = None
 
-        # Update the population _num_ages times to reach a steady state
-        for i in range(self._num_ages):
-            self._update_xylem_population(initial_growth_rate, initial_turnover_rate, self._time_step_size)
-
-        return self._xylem_population
+        return self.xylem_population
 
     def reset_xylem_damage(self):
 
@@ -208,6 +296,9 @@ class APachalisConductanceModel(HydraulicConductanceModel):
 
         # reset the xylem conductance
         self._xylem_conductance = ones(self._num_ages) * self._base_vulnerability_curve.maximum_conductance
+        self._xylem_conductance_head = 0
+        self._xylem_conductance_maximum = self._base_vulnerability_curve.maximum_conductance
+        self._xylem_cumulative_sums = None
 
         return None
 
@@ -224,16 +315,16 @@ class APachalisConductanceModel(HydraulicConductanceModel):
     @property
     def xylem_conductivity(self):
         """
-        @return: (mmol m-2 s-1 MPa-1)
+        @return: (mmol m-2 s-1 MPa-1), ordered from youngest to oldest
         """
-        return self._xylem_conductance
+        return roll(self._xylem_conductance, -self._xylem_conductance_head)
 
     @property
     def xylem_population(self):
         """
-        @return: (unitless)
+        @return: (unitless), ordered from youngest to oldest
         """
-        return self._xylem_population
+        return roll(self._xylem_population, -self._xylem_population_head)
 
     @property
     def xylem_age(self):
@@ -256,4 +347,4 @@ class APachalisConductanceModel(HydraulicConductanceModel):
         @return: (unitless)
         """
 
-        return sum(self._xylem_population)
+        return self._total_xylem_population
@@ -5,7 +5,7 @@ Analytic implementation of the model of xylem damage by embolism as described by
 -----------------------------------------------------------------------------------------
 """
 
-from numpy import exp, power, log
+from numpy import exp, power, log, clip
 from profit_optimisation_model.src.HydraulicConductanceModels.DynamicModels.D_S_Mackay_damage_model \
     import DSMackayXylemDamageModel
 from profit_optimisation_model.src.HydraulicConductanceModels.cumulative_Weibull_distribution_model \
@@ -50,13 +50,13 @@ class DSMackayXylemDamageModelAnalytic(DSMackayXylemDamageModel):
 
         """
         Update the shape of the vulnerability curve given a new maximum conductance.
-        @param new_k_max:
+        @param new_k_max: float or array
         @return: None
         """
 
-        new_k_max = min(max(new_k_max,
-                            (1. - self._critical_conductance_loss_fraction) * self._base_maximum_conductance),
-                        self._base_maximum_conductance)
+        new_k_max = clip(new_k_max,
+                         (1. - self._critical_conductance_loss_fraction) * self._base_maximum_conductance,
+                         self._base_maximum_conductance)
 
         # find the new sensitivity parameter. This is the water potential at which the
         # conductance of the healthy model is equal to the new k_max value times e to
@@ -5,6 +5,7 @@ Analytic implementation of the model of xylem damage by embolism as described by
 -----------------------------------------------------------------------------------------
 """
 
+from numpy import maximum, any
 from profit_optimisation_model.src.HydraulicConductanceModels.DynamicModels.Analytic_D_S_Mackay_damage_model \
     import DSMackayXylemDamageModelAnalytic
 from profit_optimisation_model.src.HydraulicConductanceModels.cumulative_Weibull_distribution_model \
@@ -47,11 +48,24 @@ class DSMackayXylemDamageModelAnalyticRecovery(DSMackayXylemDamageModelAnalytic)
         # NOTE: This is always less than or equal to the maximum conductance
         damage_target_maximum_conductance = self.conductance(water_potential)
 
+        previous_maximum_conductance = self._k_max
+
+        self._update_given_damage_target_maximum_conductance(damage_target_maximum_conductance)
+
+        return bool(any(self._k_max != previous_maximum_conductance))
+
+    def _update_given_damage_target_maximum_conductance(self, damage_target_maximum_conductance):
+        """
+        Move the maximum conductance towards the damage target and the base maximum conductance.
+        @param damage_target_maximum_conductance: (mmol m-2 s-1 MPa-1), float or array
+        @return: None
+        """
+
         # Calculate the change due to damage
-        damage_change = max(self._damage_rate * (self._k_max - damage_target_maximum_conductance),0)
+        damage_change = maximum(self._damage_rate * (self._k_max - damage_target_maximum_conductance), 0)
 
         # Calculate the change due to recovery
-        recovery_change = max(self._recovery_rate * (self._base_maximum_conductance - self._k_max),0)
+        recovery_change = maximum(self._recovery_rate * (self._base_maximum_conductance - self._k_max), 0)
 
         # Calculate the new maximum conductance given the current conductance and the recovery rate
         new_maximum_conductance = self._k_max + recovery_change - damage_change
@@ -59,8 +73,6 @@ class DSMackayXylemDamageModelAnalyticRecovery(DSMackayXylemDamageModelAnalytic)
         # Update the model given the new maximum conductance
         self._update_given_new_maximum_conductance(new_maximum_conductance)
 
-        return False
-
 
 def analytic_recoverable_D_S_Mackay_damage_model_from_conductance_loss(maximum_conductance,
                                                                        water_potential_1,
@@ -5,7 +5,7 @@ Implimentation of the model of xylem damage by embolism as described by D.S.Mack
 -----------------------------------------------------------------------------------------
 """
 
-from numpy import exp, linspace, asarray, clip, sum
+from numpy import exp, linspace, asarray, clip, sum, interp, power, log
 from scipy.optimize import leastsq
 from profit_optimisation_model.src.HydraulicConductanceModels.cumulative_Weibull_distribution_model \
     import (cumulative_Weibull_distribution,
@@ -20,6 +20,11 @@ class DSMackayXylemDamageModel(CumulativeWeibullDistribution):
     _base_shape_parameter: float
     _base_critical_conductance_loss_fraction: float
     _N_sample_points_xylem_damage: int
+    _exact_damage_fit: bool
+    _N_damage_fit_table_points: int
+
+    # Fitted shape parameters as a function of the fraction of the base maximum conductance
+    _damage_fit_table: tuple
 
     def __init__(self,
                  maximum_conductance,
@@ -28,13 +33,34 @@ class DSMackayXylemDamageModel(CumulativeWeibullDistribution):
                  N_sample_points_xylem_damage = 1000,
                  critical_conductance_loss_fraction = 0.9,
                  xylem_recovery_water_potnetial: float = 0.,
-                 PLC_damage_threshold = 0.05):
+                 PLC_damage_threshold = 0.05,
+                 exact_damage_fit = False,
+                 N_damage_fit_table_points = 200):
+
+        """
+        By default the damaged curve parameters are interpolated from a table of fits of the base curve capped at
+        each new maximum conductance. The table is built the first time the xylem is damaged. With exact_damage_fit
+        the current curve is refitted every time the xylem is damaged instead.
+
+        @param maximum_conductance: (mmol m-2 s-1 MPa-1)
+        @param sensitivity_parameter: (MPa)
+        @param shape_parameter: (unitless)
+        @param N_sample_points_xylem_damage: (int) number of water potentials used by each fit
+        @param critical_conductance_loss_fraction: (unitless)
+        @param xylem_recovery_water_potnetial: (MPa)
+        @param PLC_damage_threshold: (unitless)
+        @param exact_damage_fit: (bool)
+        @param N_damage_fit_table_points: (int) number of maximum conductance fractions in the fit table
+        """
 
         self._base_maximum_conductance = maximum_conductance
         self._base_sensitivity_parameter = sensitivity_parameter
         self._base_shape_parameter = shape_parameter
         self._base_critical_conductance_loss_fraction = critical_conductance_loss_fraction
         self._N_sample_points_xylem_damage = N_sample_points_xylem_damage
+        self._exact_damage_fit = exact_damage_fit
+        self._N_damage_fit_table_points = N_damage_fit_table_points
+        self._damage_fit_table = None
 
         super().__init__(maximum_conductance,
                          sensitivity_parameter,
@@ -55,32 +81,15 @@ class DSMackayXylemDamageModel(CumulativeWeibullDistribution):
 
         new_k_max = self.conductance(water_potential)
 
-        # find the new sensitivity parameter. This is the water potential at which the
-        # conductance of the current model is equal to the new k_max value times e to
-        # the minus one.
-        b_new = self.water_potential_from_conductance(new_k_max * exp(-1))
-
-        # Setup the interim capped conductance model
-        psi_array = linspace(0., self.critical_water_potential, self._N_sample_points_xylem_damage)
-        capped_conductance_array = asarray([self.conductance(psi) for psi in psi_array])
-        capped_conductance_array = clip(capped_conductance_array, 0, new_k_max)
-
-        # Calculate the conductivity loss P of the capped conductance model at each
-        # water potential.
-        P_array = 1 - capped_conductance_array / new_k_max
-
-        # Fit score to minimise as a function to pass to the curve_fit function
-        def fit_score(c_current):
-            k_prime = cumulative_Weibull_distribution(psi_array, new_k_max, b_new, c_current)
-
-            numerator = sum(P_array * k_prime) ** 2
-            denominator = (sum(P_array) ** 2) * (sum(k_prime) ** 2)
-
-            return numerator / denominator
-
-        # Fit the shape parameter c to the capped conductance model
-        c_new = leastsq(func=fit_score,
-                        x0=self.shape_parameter)[0][0]
+        if(self._exact_damage_fit):
+            b_new, c_new = fit_damaged_cumulative_Weibull_distribution(self.maximum_conductance,
+                                                                       self.sensitivity_parameter,
+                                                                       self.shape_parameter,
+                                                                       self.critical_water_potential,
+                                                                       new_k_max,
+                                                                       self._N_sample_points_xylem_damage)
+        else:
+            b_new, c_new = self._interpolate_damage_fit_table(new_k_max)
 
         # Update model parameters
         self._k_max = new_k_max
@@ -90,6 +99,61 @@ class DSMackayXylemDamageModel(CumulativeWeibullDistribution):
 
         return True
 
+    def _interpolate_damage_fit_table(self, new_k_max):
+
+        """
+        Sensitivity and shape parameters of the base curve capped at the new maximum conductance. The sensitivity
+        parameter is calculated directly and the fitted shape parameter is interpolated. Below the smallest fraction
+        in the table the base curve is fitted directly.
+        @param new_k_max: (mmol m-2 s-1 MPa-1)
+        @return: sensitivity parameter (MPa)
+        @return: shape parameter (unitless)
+        """
+
+        if(self._damage_fit_table is None):
+            self._damage_fit_table = self._tabulate_damage_fits()
+
+        maximum_conductance_fractions, shape_parameters = self._damage_fit_table
+
+        maximum_conductance_fraction = new_k_max / self._base_maximum_conductance
+
+        if(maximum_conductance_fraction < maximum_conductance_fractions[0]):
+            return fit_damaged_cumulative_Weibull_distribution(self._base_maximum_conductance,
+                                                               self._base_sensitivity_parameter,
+                                                               self._base_shape_parameter,
+                                                               self._base_critical_water_potential,
+                                                               new_k_max,
+                                                               self._N_sample_points_xylem_damage)
+
+        # The base conductance is the new maximum conductance times e to the minus one at the sensitivity parameter
+        b_new = (self._base_sensitivity_parameter
+                 * power(1 - log(maximum_conductance_fraction), 1 / self._base_shape_parameter))
+
+        return b_new, interp(maximum_conductance_fraction, maximum_conductance_fractions, shape_parameters)
+
+    def _tabulate_damage_fits(self):
+
+        """
+        Fit the shape parameter of the base curve capped at evenly spaced fractions of the base maximum conductance.
+        @return: maximum conductance fractions (unitless)
+        @return: shape parameters (unitless)
+        """
+
+        maximum_conductance_fractions = linspace(1. / self._N_damage_fit_table_points,
+                                                 1.,
+                                                 self._N_damage_fit_table_points)
+
+        shape_parameters = asarray([fit_damaged_cumulative_Weibull_distribution(self._base_maximum_conductance,
+                                                                                self._base_sensitivity_parameter,
+                                                                                self._base_shape_parameter,
+                                                                                self._base_critical_water_potential,
+                                                                                maximum_conductance_fraction
+                                                                                * self._base_maximum_conductance,
+                                                                                self._N_sample_points_xylem_damage)[1]
+                                    for maximum_conductance_fraction in maximum_conductance_fractions])
+
+        return maximum_conductance_fractions, shape_parameters
+
     def _recover_xylem(self, water_potential, timestep):
         """
         @param water_potential: (MPa)
@@ -109,6 +173,68 @@ class DSMackayXylemDamageModel(CumulativeWeibullDistribution):
         self._critical_conductance_loss_fraction = self._base_critical_conductance_loss_fraction
         return None
 
+    @property
+    def _base_critical_water_potential(self):
+        """
+        @return: (MPa) critical water potential of the undamaged curve
+        """
+        return (self._base_sensitivity_parameter
+                * power(- log(1. - self._base_critical_conductance_loss_fraction), 1 / self._base_shape_parameter))
+
+
+def fit_damaged_cumulative_Weibull_distribution(maximum_conductance,
+                                                sensitivity_parameter,
+                                                shape_parameter,
+                                                critical_water_potential,
+                                                new_maximum_conductance,
+                                                N_sample_points = 1000):
+
+    """
+    Fits a cumulative Weibull distribution with the new maximum conductance to the given curve capped at the new
+    maximum conductance.
+    @param maximum_conductance: (mmol m-2 s-1 MPa-1)
+    @param sensitivity_parameter: (MPa)
+    @param shape_parameter: (unitless)
+    @param critical_water_potential: (MPa) lower end of the water potentials used in the fit
+    @param new_maximum_conductance: (mmol m-2 s-1 MPa-1)
+    @param N_sample_points: (int)
+    @return: sensitivity parameter (MPa)
+    @return: shape parameter (unitless)
+    """
+
+    # find the new sensitivity parameter. This is the water potential at which the
+    # conductance of the current model is equal to the new k_max value times e to
+    # the minus one.
+    conductivity_fraction = new_maximum_conductance * exp(-1) / maximum_conductance
+    b_new = sensitivity_parameter * power(- log(conductivity_fraction), 1 / shape_parameter)
+
+    # Setup the interim capped conductance model
+    psi_array = linspace(0., critical_water_potential, N_sample_points)
+    capped_conductance_array = clip(cumulative_Weibull_distribution(psi_array,
+                                                                    maximum_conductance,
+                                                                    sensitivity_parameter,
+                                                                    shape_parameter),
+                                    0, new_maximum_conductance)
+
+    # Calculate the conductivity loss P of the capped conductance model at each
+    # water potential.
+    P_array = 1 - capped_conductance_array / new_maximum_conductance
+
+    # Fit score to minimise as a function to pass to the curve_fit function
+    def fit_score(c_current):
+        k_prime = cumulative_Weibull_distribution(psi_array, new_maximum_conductance, b_new, c_current)
+
+        numerator = sum(P_array * k_prime) ** 2
+        denominator = (sum(P_array) ** 2) * (sum(k_prime) ** 2)
+
+        return numerator / denominator
+
+    # Fit the shape parameter c to the capped conductance model
+    c_new = leastsq(func=fit_score,
+                    x0=shape_parameter)[0][0]
+
+    return b_new, c_new
+
 def D_S_Mackay_damage_model_from_conductance_loss(maximum_conductance,
                                                   water_potential_1,
                                                   water_potential_2,
@@ -117,7 +243,9 @@ def D_S_Mackay_damage_model_from_conductance_loss(maximum_conductance,
                                                   N_sample_points_xylem_damage = 1000,
                                                   critical_conductance_loss_fraction = 0.9,
                                                   xylem_recovery_water_potnetial = 0.,
-                                                  PLC_damage_threshold = 0.05):
+                                                  PLC_damage_threshold = 0.05,
+                                                  exact_damage_fit = False,
+                                                  N_damage_fit_table_points = 200):
 
     """
     @param maximum_conductance:
@@ -129,6 +257,8 @@ def D_S_Mackay_damage_model_from_conductance_loss(maximum_conductance,
     @param critical_conductance_loss_fraction: unitless
     @param xylem_recovery_water_potnetial: MPa
     @param PLC_damage_threshold: unitless
+    @param exact_damage_fit: bool
+    @param N_damage_fit_table_points: int
     @return: DSMackayXylemDamageModel
     """
 
@@ -145,4 +275,6 @@ def D_S_Mackay_damage_model_from_conductance_loss(maximum_conductance,
                                     N_sample_points_xylem_damage,
                                     critical_conductance_loss_fraction,
                                     xylem_recovery_water_potnetial,
-                                    PLC_damage_threshold)
\ No newline at end of file
+                                    PLC_damage_threshold,
+                                    exact_damage_fit,
+                                    N_damage_fit_table_points)
\ No newline at end of file
@@ -4,6 +4,7 @@
 -----------------------------------------------------------------------------------------
 """
 
+from numpy import any
 from profit_optimisation_model.src.HydraulicConductanceModels.DynamicModels.Analytic_D_S_Mackay_damage_model \
     import DSMackayXylemDamageModelAnalytic
 from profit_optimisation_model.src.HydraulicConductanceModels.cumulative_Weibull_distribution_model \
@@ -55,13 +56,45 @@ class JBDynamicXylemConductanceModel(DSMackayXylemDamageModelAnalytic):
                          0.)
 
     def update_xylem_damage(self, water_potential, timestep, transpiration_rate, root_water_potential):
+        """
+        @param water_potential: (MPa)
+        @param timestep: (s)
+        @param transpiration_rate: (mmol m-2 s-1)
+        @param root_water_potential: (MPa)
+        @return: bool indicting if the model has changed
+        """
+
+        previous_maximum_conductance = self._k_max
+        previous_sapwood_area = self._sapwood_area
 
         # Calculate the new sapwood area
-        self._sapwood_area += (self._growth_rate - self._death_rate) * timestep
+        self._sapwood_area = self._sapwood_area + (self._growth_rate - self._death_rate) * timestep
 
         # calculate the current leaf conductance
         k_leaf = self.conductance(water_potential)
 
+        self._update_given_leaf_conductance(k_leaf, timestep)
+
+        return self._has_changed(previous_maximum_conductance, previous_sapwood_area)
+
+    def _has_changed(self, previous_maximum_conductance, previous_sapwood_area):
+        """
+        @param previous_maximum_conductance: (mmol m-2 s-1 MPa-1), float or array
+        @param previous_sapwood_area: (m2), float or array
+        @return: bool indicting if the maximum conductance or sapwood area of the model has changed
+        """
+
+        return bool(any(self._k_max != previous_maximum_conductance)
+                    or any(self._sapwood_area != previous_sapwood_area))
+
+    def _update_given_leaf_conductance(self, k_leaf, timestep):
+        """
+        Update the maximum conductance given the current leaf conductance.
+        @param k_leaf: (mmol m-2 s-1 MPa-1), float or array
+        @param timestep: (s)
+        @return: None
+        """
+
         # Calculate the impairment and recovery rates
         recovery_rate = self._calc_recovery_rate(k_leaf)
         impairment_rate = self._calc_impairment_rate(k_leaf)
@@ -80,8 +113,6 @@ class JBDynamicXylemConductanceModel(DSMackayXylemDamageModelAnalytic):
         #self._k_max = max(new_k_max, self.critical_conductance)
         self._update_given_new_maximum_conductance(new_k_max)
 
-        return False
-
     def _calc_recovery_rate(self, k_leaf):
         return self._recovery_rate * (k_leaf / self.maximum_conductance)**self._recovery_shape
 
@@ -78,6 +78,22 @@ class WholeTrunkImapirmentModel(HydraulicConductanceModel):
 
         return transpiration
 
+    def transpiration_as_a_function_of_leaf_water_potential(self, leaf_water_potentials, soil_water_potential):
+
+        # Calculate the extreme water potentials for each leaf water potential
+        tmp_psi_leaf_extremes = minimum(self._psi_leaf_extreme, leaf_water_potentials)
+        tmp_psi_root_extreme = min(self._psi_root_extreme, soil_water_potential)
+
+        # Calculate the transpiration over the extreme water potentials with a single cumulative integral
+        transpiration = self._base_conductance_model.transpiration_as_a_function_of_leaf_water_potential(
+            tmp_psi_leaf_extremes,
+            tmp_psi_root_extreme)
+
+        # Scale the transpiration to the current water potential limits
+        transpiration *= (soil_water_potential - leaf_water_potentials) / (tmp_psi_root_extreme - tmp_psi_leaf_extremes)
+
+        return transpiration
+
     def _damage_xylem(self, water_potential, timestep, transpiration_rate, root_water_potential):
         """
         @param water_potential: (MPa)
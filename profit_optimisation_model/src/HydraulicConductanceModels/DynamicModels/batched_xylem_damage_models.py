@@ -0,0 +1,319 @@
+"""
+-----------------------------------------------------------------------------------------
+Batched versions of the analytic xylem damage models. The parameters and the damage
+state, i.e. the maximum conductance, the vulnerability curve parameters and the sapwood
+area, are 1d arrays with a value for each plant. update_xylem_damage takes a water
+potential for each plant and advances every plant in one call.
+-----------------------------------------------------------------------------------------
+"""
+
+from numpy import asarray, where
+
+from profit_optimisation_model.src.HydraulicConductanceModels.batched_conductance_models import (
+    BatchedCumulativeWeibullDistribution)
+from profit_optimisation_model.src.HydraulicConductanceModels.cumulative_Weibull_distribution_model import (
+    cumulative_Weibull_distribution_parameters_from_conductance_loss)
+from profit_optimisation_model.src.HydraulicConductanceModels.DynamicModels.Analytic_D_S_Mackay_damage_model \
+    import DSMackayXylemDamageModelAnalytic
+from profit_optimisation_model.src.HydraulicConductanceModels.DynamicModels.\
+    Analytic_recoverable_D_S_Mackay_damage_model import DSMackayXylemDamageModelAnalyticRecovery
+from profit_optimisation_model.src.HydraulicConductanceModels.DynamicModels.JB_xylem_impairment_model \
+    import JBDynamicXylemConductanceModel
+
+
+class BatchedDSMackayXylemDamageModelAnalytic(BatchedCumulativeWeibullDistribution,
+                                              DSMackayXylemDamageModelAnalytic):
+
+    def __init__(self,
+                 maximum_conductance,
+                 sensitivity_parameter,
+                 shape_parameter,
+                 critical_conductance_loss_fraction = 0.9,
+                 xylem_recovery_water_potnetial: float = 0.,
+                 PLC_damage_threshold = 0.05):
+
+        """
+
+        @param maximum_conductance: 1d array (mmol m-2 s-1 MPa-1)
+        @param sensitivity_parameter: 1d array (MPa)
+        @param shape_parameter: 1d array (unitless)
+        @param critical_conductance_loss_fraction: (unitless)
+        @param xylem_recovery_water_potnetial: (MPa)
+        @param PLC_damage_threshold: (unitless)
+        """
+
+        DSMackayXylemDamageModelAnalytic.__init__(self,
+                                                  asarray(maximum_conductance, dtype=float),
+                                                  asarray(sensitivity_parameter, dtype=float),
+                                                  asarray(shape_parameter, dtype=float),
+                                                  critical_conductance_loss_fraction,
+                                                  xylem_recovery_water_potnetial,
+                                                  PLC_damage_threshold)
+
+    def update_xylem_damage(self, water_potential, timestep, transpiration_rate, root_water_potential):
+        """
+        Plants at or above the recovery water potential are reset, plants whose conductance has dropped past the
+        damage threshold are damaged and the remaining plants are unchanged.
+        @param water_potential: (MPa), float or 1d array with a value for each plant
+        @param timestep: (s)
+        @param transpiration_rate: (mmol m-2 s-1)
+        @param root_water_potential: (MPa)
+        @return: bool indicting if the model of any plant has changed
+        """
+
+        water_potential = asarray(water_potential, dtype=float)
+
+        conductance = self.conductance_of_each_plant(water_potential)
+
+        recovering = water_potential >= self._xylem_recovery_water_potnetial
+        damaged = ~recovering & (conductance <= self.maximum_conductance * (1 - self._PLC_damage_threshold))
+
+        new_k_max = where(recovering,
+                          self._base_maximum_conductance,
+                          where(damaged, conductance, self._k_max))
+
+        self._update_given_new_maximum_conductance(new_k_max)
+
+        return bool((recovering | damaged).any())
+
+
+class BatchedDSMackayXylemDamageModelAnalyticRecovery(BatchedCumulativeWeibullDistribution,
+                                                      DSMackayXylemDamageModelAnalyticRecovery):
+
+    def __init__(self,
+                 maximum_conductance,
+                 sensitivity_parameter,
+                 shape_parameter,
+                 critical_conductance_loss_fraction = 0.9,
+                 recovery_rate = 0.01,
+                 damage_rate = 0.01):
+
+        """
+
+        @param maximum_conductance: 1d array (mmol m-2 s-1 MPa-1)
+        @param sensitivity_parameter: 1d array (MPa)
+        @param shape_parameter: 1d array (unitless)
+        @param critical_conductance_loss_fraction: (unitless)
+        @param recovery_rate: (unitless), float or 1d array
+        @param damage_rate: (unitless), float or 1d array
+        """
+
+        DSMackayXylemDamageModelAnalyticRecovery.__init__(self,
+                                                          asarray(maximum_conductance, dtype=float),
+                                                          asarray(sensitivity_parameter, dtype=float),
+                                                          asarray(shape_parameter, dtype=float),
+                                                          critical_conductance_loss_fraction,
+                                                          recovery_rate,
+                                                          damage_rate)
+
+    def update_xylem_damage(self, water_potential, timestep, transpiration_rate, root_water_potential):
+        """
+        @param water_potential: (MPa), float or 1d array with a value for each plant
+        @param timestep: (s)
+        @param transpiration_rate: (mmol m-2 s-1)
+        @param root_water_potential: (MPa)
+        @return: bool indicting if the model has changed
+        """
+
+        damage_target_maximum_conductance = self.conductance_of_each_plant(water_potential)
+
+        previous_maximum_conductance = self._k_max
+
+        self._update_given_damage_target_maximum_conductance(damage_target_maximum_conductance)
+
+        return bool((self._k_max != previous_maximum_conductance).any())
+
+
+class BatchedJBDynamicXylemConductanceModel(BatchedCumulativeWeibullDistribution, JBDynamicXylemConductanceModel):
+
+    def __init__(self,
+                 maximum_conductance,
+                 sapwood_area,
+                 sensitivity_parameter,
+                 shape_parameter,
+                 critical_conductance_loss_fraction=0.9,
+                 recovery_rate = 0.01,
+                 recovery_shape = 1.0,
+                 impairment_rate = 0.01,
+                 impairment_shape = 1.0,
+                 growth_rate = 0.01,
+                 death_rate = 0.01,
+                 death_shape = 1.0
+                 ):
+
+        """
+        The rates and shapes are floats or 1d arrays with a value for each plant.
+
+        @param maximum_conductance: 1d array (mmol m-2 s-1 MPa-1)
+        @param sapwood_area: 1d array (m2)
+        @param sensitivity_parameter: 1d array (MPa)
+        @param shape_parameter: 1d array (unitless)
+        @param critical_conductance_loss_fraction: (unitless)
+        """
+
+        JBDynamicXylemConductanceModel.__init__(self,
+                                                asarray(maximum_conductance, dtype=float),
+                                                asarray(sapwood_area, dtype=float),
+                                                asarray(sensitivity_parameter, dtype=float),
+                                                asarray(shape_parameter, dtype=float),
+                                                critical_conductance_loss_fraction,
+                                                recovery_rate,
+                                                recovery_shape,
+                                                impairment_rate,
+                                                impairment_shape,
+                                                growth_rate,
+                                                death_rate,
+                                                death_shape)
+
+    def update_xylem_damage(self, water_potential, timestep, transpiration_rate, root_water_potential):
+        """
+        @param water_potential: (MPa), float or 1d array with a value for each plant
+        @param timestep: (s)
+        @param transpiration_rate: (mmol m-2 s-1)
+        @param root_water_potential: (MPa)
+        @return: bool indicting if the model has changed
+        """
+
+        previous_maximum_conductance = self._k_max
+        previous_sapwood_area = self._sapwood_area
+
+        # Calculate the new sapwood area
+        self._sapwood_area = self._sapwood_area + (self._growth_rate - self._death_rate) * timestep
+
+        # calculate the current leaf conductance of each plant
+        k_leaf = self.conductance_of_each_plant(water_potential)
+
+        self._update_given_leaf_conductance(k_leaf, timestep)
+
+        return self._has_changed(previous_maximum_conductance, previous_sapwood_area)
+
+
+# -- Model creation functions ------------------------------------------------
+
+
+def batched_analytic_D_S_Mackay_damage_model_from_conductance_loss(maximum_conductance,
+                                                                   water_potential_1,
+                                                                   water_potential_2,
+                                                                   conductance_loss_fraction_1,
+                                                                   conductance_loss_fraction_2,
+                                                                   critical_conductance_loss_fraction = 0.9,
+                                                                   xylem_recovery_water_potnetial = 0.,
+                                                                   PLC_damage_threshold = 0.05):
+
+    """
+    @param maximum_conductance: 1d array (mmol m-2 s-1 MPa-1)
+    @param water_potential_1: 1d array (MPa)
+    @param water_potential_2: 1d array (MPa)
+    @param conductance_loss_fraction_1: unitless
+    @param conductance_loss_fraction_2: unitless
+    @param critical_conductance_loss_fraction: unitless
+    @param xylem_recovery_water_potnetial: MPa
+    @param PLC_damage_threshold: unitless
+    @return: BatchedDSMackayXylemDamageModelAnalytic
+    """
+
+    maximum_conductance, sensitivity_parameter, shape_parameter = \
+        cumulative_Weibull_distribution_parameters_from_conductance_loss(asarray(maximum_conductance, dtype=float),
+                                                                         asarray(water_potential_1, dtype=float),
+                                                                         asarray(water_potential_2, dtype=float),
+                                                                         conductance_loss_fraction_1,
+                                                                         conductance_loss_fraction_2)
+
+    return BatchedDSMackayXylemDamageModelAnalytic(maximum_conductance,
+                                                   sensitivity_parameter,
+                                                   shape_parameter,
+                                                   critical_conductance_loss_fraction,
+                                                   xylem_recovery_water_potnetial,
+                                                   PLC_damage_threshold)
+
+
+def batched_analytic_recoverable_D_S_Mackay_damage_model_from_conductance_loss(
+        maximum_conductance,
+        water_potential_1,
+        water_potential_2,
+        conductance_loss_fraction_1,
+        conductance_loss_fraction_2,
+        critical_conductance_loss_fraction = 0.9,
+        recovery_rate = 0.01,
+        damage_rate = 0.01):
+
+    """
+    @param maximum_conductance: 1d array (mmol m-2 s-1 MPa-1)
+    @param water_potential_1: 1d array (MPa)
+    @param water_potential_2: 1d array (MPa)
+    @param conductance_loss_fraction_1: unitless
+    @param conductance_loss_fraction_2: unitless
+    @param critical_conductance_loss_fraction: unitless
+    @param recovery_rate: unitless
+    @param damage_rate: unitless
+    @return: BatchedDSMackayXylemDamageModelAnalyticRecovery
+    """
+
+    maximum_conductance, sensitivity_parameter, shape_parameter = \
+        cumulative_Weibull_distribution_parameters_from_conductance_loss(asarray(maximum_conductance, dtype=float),
+                                                                         asarray(water_potential_1, dtype=float),
+                                                                         asarray(water_potential_2, dtype=float),
+                                                                         conductance_loss_fraction_1,
+                                                                         conductance_loss_fraction_2)
+
+    return BatchedDSMackayXylemDamageModelAnalyticRecovery(maximum_conductance,
+                                                           sensitivity_parameter,
+                                                           shape_parameter,
+                                                           critical_conductance_loss_fraction,
+                                                           recovery_rate,
+                                                           damage_rate)
+
+
+def batched_JB_xylem_damage_model_from_conductance_loss(maximum_conductance,
+                                                        sapwood_area,
+                                                        water_potential_1,
+                                                        water_potential_2,
+                                                        conductance_loss_fraction_1,
+                                                        conductance_loss_fraction_2,
+                                                        critical_conductance_loss_fraction = 0.9,
+                                                        recovery_rate = 0.01,
+                                                        recovery_shape = 1.0,
+                                                        impairment_rate = 0.01,
+                                                        impairment_shape = 1.0,
+                                                        growth_rate = 0.01,
+                                                        death_rate = 0.01,
+                                                        death_shape = 1.0
+                                                        ):
+
+    """
+    @param maximum_conductance: 1d array (mmol m-2 s-1 MPa-1)
+    @param sapwood_area: 1d array (m2)
+    @param water_potential_1: 1d array (MPa)
+    @param water_potential_2: 1d array (MPa)
+    @param conductance_loss_fraction_1: unitless
+    @param conductance_loss_fraction_2: unitless
+    @param critical_conductance_loss_fraction: unitless
+    @param recovery_rate: unitless
+    @param recovery_shape: unitless
+    @param impairment_rate: unitless
+    @param impairment_shape: unitless
+    @param growth_rate: unitless
+    @param death_rate: unitless
+    @param death_shape: unitless
+    @return: BatchedJBDynamicXylemConductanceModel
+    """
+
+    maximum_conductance, sensitivity_parameter, shape_parameter = \
+        cumulative_Weibull_distribution_parameters_from_conductance_loss(asarray(maximum_conductance, dtype=float),
+                                                                         asarray(water_potential_1, dtype=float),
+                                                                         asarray(water_potential_2, dtype=float),
+                                                                         conductance_loss_fraction_1,
+                                                                         conductance_loss_fraction_2)
+
+    return BatchedJBDynamicXylemConductanceModel(maximum_conductance,
+                                                 sapwood_area,
+                                                 sensitivity_parameter,
+                                                 shape_parameter,
+                                                 critical_conductance_loss_fraction,
+                                                 recovery_rate,
+                                                 recovery_shape,
+                                                 impairment_rate,
+                                                 impairment_shape,
+                                                 growth_rate,
+                                                 death_rate,
+                                                 death_shape)
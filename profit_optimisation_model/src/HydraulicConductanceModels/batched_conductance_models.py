@@ -0,0 +1,280 @@
+"""
+-----------------------------------------------------------------------------------------
+Batched versions of the static conductance models. The parameters are 1d arrays with a
+value for each plant, so a single model object describes many plants. Results are
+arrays with the plants along the first axis and the water potentials along the last
+axis.
+-----------------------------------------------------------------------------------------
+"""
+
+from numpy import asarray, newaxis, power, log
+
+from profit_optimisation_model.src.HydraulicConductanceModels.cumulative_Weibull_distribution_model import (
+    CumulativeWeibullDistribution, cumulative_Weibull_distribution, integrated_cumulative_Weibull_distribution,
+    cumulative_Weibull_distribution_parameters_from_conductance_loss)
+from profit_optimisation_model.src.HydraulicConductanceModels.SOX_hydraulic_conductance_model import (
+    SOXHydraulicConductanceModel, integrated_SOX_conductance,
+    SOX_conductance_parameters_from_conductance_loss_at_goven_water_potentials)
+
+
+class BatchedHydraulicConductanceModel:
+    """
+    Methods shared by the batched conductance models. Must come before the conductance model in the bases.
+    """
+
+    def PLC(self, water_potential):
+        """
+        @param water_potential: (MPa), float or array with the water potentials along the last axis
+        @return: (unitless), plants x water potentials
+        """
+        return 100*(1 - self.conductance(water_potential) / self.healthy_maximum_conductance[:, newaxis])
+
+    def conductance_of_each_plant(self, water_potential):
+        """
+        @param water_potential: (MPa), float or 1d array with a value for each plant
+        @return: conductance (mmol m-2 s-1 MPa-1) of each plant at its own water potential
+        """
+        return self.conductance(asarray(water_potential)[..., newaxis])[..., 0]
+
+    def water_potential_from_conductance(self, conductance):
+        """
+
+        @param conductance: (mmol m-2 s-1 MPa-1), float or array with the conductances along the last axis
+        @return: (MPa), plants x conductances
+        """
+
+        conductivity_loss_fraction = 1 - conductance/self.maximum_conductance[:, newaxis]
+
+        return self.water_potential_from_conductivity_loss_fraction(conductivity_loss_fraction)
+
+    def transpiration(self, min_water_potential, max_water_potential, steps = 100):
+        """
+        @param min_water_potential: float or 1d array with a value for each plant (MPa)
+        @param max_water_potential: float or 1d array with a value for each plant (MPa)
+        @param steps: not used, the integral is exact
+        @return: (mmol m-2 s-1), a value for each plant
+        """
+
+        return (self.integrated_conductance(asarray(max_water_potential)[..., newaxis])
+                - self.integrated_conductance(asarray(min_water_potential)[..., newaxis]))[..., 0]
+
+    @property
+    def number_of_plants(self):
+        """
+        @return: (unitless)
+        """
+        return len(self._k_max)
+
+
+class BatchedCumulativeWeibullDistribution(BatchedHydraulicConductanceModel, CumulativeWeibullDistribution):
+
+    def __init__(self,
+                 maximum_conductance,
+                 sensitivity_parameter,
+                 shape_parameter,
+                 critical_conductance_loss_fraction: float = 0.9,
+                 xylem_recovery_water_potnetial: float = 0.,
+                 PLC_damage_threshold: float = 0.1):
+
+        """
+
+        @param maximum_conductance: 1d array (mmol m-2 s-1 MPa-1)
+        @param sensitivity_parameter: 1d array (MPa)
+        @param shape_parameter: 1d array (unitless)
+        @param critical_conductance_loss_fraction: (unitless)
+        @param xylem_recovery_water_potnetial: (MPa)
+        """
+
+        super().__init__(asarray(maximum_conductance, dtype=float),
+                         asarray(sensitivity_parameter, dtype=float),
+                         asarray(shape_parameter, dtype=float),
+                         critical_conductance_loss_fraction,
+                         xylem_recovery_water_potnetial,
+                         PLC_damage_threshold)
+
+    def conductance(self, water_potential, leaf_water_potential=None, soil_water_potential=None):
+
+        """
+
+        @param water_potential: (MPa), float or array with the water potentials along the last axis
+        @param leaf_water_potential: (MPa)
+        @param soil_water_potential: (MPa)
+        @return: conductance (mmol m-2 s-1 MPa-1), plants x water potentials
+        """
+
+        return cumulative_Weibull_distribution(water_potential,
+                                               self.maximum_conductance[:, newaxis],
+                                               self.sensitivity_parameter[:, newaxis],
+                                               self.shape_parameter[:, newaxis])
+
+    def water_potential_from_conductivity_loss_fraction(self, conductivity_loss_fraction):
+        """
+
+        @param conductivity_loss_fraction: (unitless), float or array with the fractions along the last axis
+        @return: (MPa), plants x fractions
+        """
+
+        conductivity_fraction = 1. - conductivity_loss_fraction
+
+        return (self.sensitivity_parameter[:, newaxis]
+                * power(- log(conductivity_fraction), 1/self.shape_parameter[:, newaxis]))
+
+    def integrated_conductance(self, water_potential):
+        """
+        @param water_potential: (MPa), float or array with the water potentials along the last axis
+        @return: (mmol m-2 s-1), plants x water potentials
+        """
+
+        return integrated_cumulative_Weibull_distribution(water_potential,
+                                                          self.maximum_conductance[:, newaxis],
+                                                          self.sensitivity_parameter[:, newaxis],
+                                                          self.shape_parameter[:, newaxis])
+
+
+class BatchedSOXHydraulicConductanceModel(BatchedHydraulicConductanceModel, SOXHydraulicConductanceModel):
+
+    def __init__(self,
+                 maximum_conductance,
+                 water_potential_at_half_conductance,
+                 shape_parameter,
+                 critical_conductance_loss_fraction: float = 0.9,
+                 xylen_recovery_water_potential: float = 0.):
+
+        """
+
+        @param maximum_conductance: 1d array (mmol m-2 s-1 MPa-1)
+        @param water_potential_at_half_conductance: 1d array (MPa)
+        @param shape_parameter: 1d array (unitless)
+        @param critical_conductance_loss_fraction: (unitless)
+        """
+
+        super().__init__(asarray(maximum_conductance, dtype=float),
+                         asarray(water_potential_at_half_conductance, dtype=float),
+                         asarray(shape_parameter, dtype=float),
+                         critical_conductance_loss_fraction,
+                         xylen_recovery_water_potential)
+
+    def conductance(self, water_potential, leaf_water_potential=None, soil_water_potential=None):
+        """
+
+        @param water_potential: (MPa), float or array with the water potentials along the last axis
+        @return: conductance (mmol m-2 s-1 MPa-1), plants x water potentials
+        """
+
+        normalised_conductance = 1/(1+power(water_potential/self._water_potential_at_half_conductance[:, newaxis],
+                                            self._shape_parameter[:, newaxis]))
+
+        return self._k_max[:, newaxis] * normalised_conductance
+
+    def water_potential_from_conductivity_loss_fraction(self, conductivity_loss_fraction):
+        """
+
+        @param conductivity_loss_fraction: (unitless), float or array with the fractions along the last axis
+        @return: (MPa), plants x fractions
+        """
+
+        conductance_fraction = 1 - conductivity_loss_fraction
+
+        return (self._water_potential_at_half_conductance[:, newaxis]
+                * power(1/conductance_fraction - 1, 1/self._shape_parameter[:, newaxis]))
+
+    def integrated_conductance(self, water_potential):
+        """
+        @param water_potential: (MPa), float or array with the water potentials along the last axis
+        @return: (mmol m-2 s-1), plants x water potentials
+        """
+
+        return integrated_SOX_conductance(water_potential,
+                                          self._k_max[:, newaxis],
+                                          self._water_potential_at_half_conductance[:, newaxis],
+                                          self._shape_parameter[:, newaxis])
+
+
+# -- Model creation functions ------------------------------------------------
+
+
+def batched_cumulative_Weibull_distribution_from_conductance_loss_at_given_water_potentials(
+        maximum_conductance,
+        water_potential_1,
+        water_potential_2,
+        conductance_loss_fraction_1,
+        conductance_loss_fraction_2,
+        critical_conductance_loss_fraction = 0.9,
+        xylem_recovery_water_potnetial = 0.,
+        PLC_damage_threshold = 0.1
+        ):
+
+    """
+    Creates a batched cumulative Weibull distribution from the fractional conductive loss at two given water
+    potentials for each plant
+
+    @param maximum_conductance: 1d array (mmol m-2 s-1 MPa-1)
+    @param water_potential_1: 1d array (MPa)
+    @param water_potential_2: 1d array (MPa)
+    @param conductance_loss_fraction_1: (unitless)
+    @param conductance_loss_fraction_2: (unitless)
+    @param critical_conductance_loss_fraction: (unitless)
+    @param xylem_recovery_water_potnetial: (MPa)
+    @param PLC_damage_threshold: (unitless)
+
+    @return: BatchedCumulativeWeibullDistribution
+    """
+
+    maximum_conductance, sensitivity_parameter, shape_parameter = \
+        cumulative_Weibull_distribution_parameters_from_conductance_loss(asarray(maximum_conductance, dtype=float),
+                                                                         asarray(water_potential_1, dtype=float),
+                                                                         asarray(water_potential_2, dtype=float),
+                                                                         conductance_loss_fraction_1,
+                                                                         conductance_loss_fraction_2
+                                                                         )
+
+    return BatchedCumulativeWeibullDistribution(maximum_conductance,
+                                                sensitivity_parameter,
+                                                shape_parameter,
+                                                critical_conductance_loss_fraction,
+                                                xylem_recovery_water_potnetial,
+                                                PLC_damage_threshold
+                                                )
+
+
+def batched_SOX_conductance_model_from_conductance_loss_at_given_water_potentials(
+        maximum_conductance,
+        water_potential_1,
+        water_potential_2,
+        conductance_loss_fraction_1,
+        conductance_loss_fraction_2,
+        critical_conductance_loss_fraction = 0.9,
+        xylem_recovery_water_potnetial = 0.
+        ):
+
+    """
+    Creates a batched SOX conductance model from the fractional conductive loss at two given water potentials for
+    each plant
+
+    @param maximum_conductance: 1d array (mmol m-2 s-1 MPa-1)
+    @param water_potential_1: 1d array (MPa)
+    @param water_potential_2: 1d array (MPa)
+    @param conductance_loss_fraction_1: (unitless)
+    @param conductance_loss_fraction_2: (unitless)
+    @param critical_conductance_loss_fraction: (unitless)
+    @param xylem_recovery_water_potnetial: (MPa)
+
+    @return: BatchedSOXHydraulicConductanceModel
+    """
+
+    maximum_conductance, water_potential_at_half_conductance, shape_parameter = (
+        SOX_conductance_parameters_from_conductance_loss_at_goven_water_potentials(
+            asarray(maximum_conductance, dtype=float),
+            asarray(water_potential_1, dtype=float),
+            asarray(water_potential_2, dtype=float),
+            conductance_loss_fraction_1,
+            conductance_loss_fraction_2
+            )
+        )
+
+    return BatchedSOXHydraulicConductanceModel(maximum_conductance,
+                                               water_potential_at_half_conductance,
+                                               shape_parameter,
+                                               critical_conductance_loss_fraction,
+                                               xylem_recovery_water_potnetial
+                                               )
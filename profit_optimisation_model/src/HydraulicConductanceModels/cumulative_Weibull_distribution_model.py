@@ -6,7 +6,8 @@
 
 from profit_optimisation_model.src.HydraulicConductanceModels.hydraulic_conductance_model \
     import HydraulicConductanceModel
-from numpy import exp, power, log, abs
+from numpy import exp, power, log, abs, asarray, newaxis
+from scipy.special import gamma, gammainc
 
 
 class CumulativeWeibullDistribution(HydraulicConductanceModel):
@@ -64,6 +65,42 @@ class CumulativeWeibullDistribution(HydraulicConductanceModel):
 
         return self.sensitivity_parameter * power(- log(conductivity_fraction), 1/self.shape_parameter)
 
+    def integrated_conductance(self, water_potential):
+        """
+        Integral of the conductance from zero to the given water potential. Calculated exactly using the regularised
+        lower incomplete gamma function.
+        @param water_potential: (MPa)
+        @return: (mmol m-2 s-1)
+        """
+
+        return integrated_cumulative_Weibull_distribution(water_potential,
+                                                          self.maximum_conductance,
+                                                          self.sensitivity_parameter,
+                                                          self.shape_parameter)
+
+    def transpiration(self, min_water_potential, max_water_potential, steps = 100):
+        """
+        Calculates the transpiration rate across the water potentials using the exact integral of the conductance
+        @param min_water_potential: float or array (MPa)
+        @param max_water_potential: float or array (MPa)
+        @param steps: not used, the integral is exact
+        @return: (mmol m-2 s-1)
+        """
+
+        return self.integrated_conductance(max_water_potential) - self.integrated_conductance(min_water_potential)
+
+    def transpiration_as_a_function_of_leaf_water_potential(self, leaf_water_potentials, soil_water_potential):
+        """
+        Calculates the transpiration rate from the soil water potential to each of the leaf water potentials using
+        the exact integral of the conductance
+        @param leaf_water_potentials: numpy array with the leaf water potentials along the last axis (MPa)
+        @param soil_water_potential: float or array broadcasting against the other axes (MPa)
+        @return: array of transpiration rates (mmol m-2 s-1)
+        """
+
+        return (self.integrated_conductance(asarray(soil_water_potential)[..., newaxis])
+                - self.integrated_conductance(leaf_water_potentials))
+
     def water_potential_from_conductance(self, conductance):
         """
 
@@ -106,6 +143,28 @@ def cumulative_Weibull_distribution(water_potentials, maximum_conductance, sensi
     return maximum_conductance * exp(exponent)
 
 
+def integrated_cumulative_Weibull_distribution(water_potentials,
+                                               maximum_conductance,
+                                               sensitivity_parameter,
+                                               shape_parameter):
+
+    """
+    Integral of the cumulative Weibull distribution from zero to the given water potentials. Substituting
+    x = (water_potential/sensitivity_parameter)^shape_parameter gives the lower incomplete gamma function.
+
+    @param water_potentials: (MPa)
+    @param maximum_conductance: (mmol m-2 s-1 MPa-1)
+    @param sensitivity_parameter: (MPa)
+    @param shape_parameter: (unitless)
+    @return: (mmol m-2 s-1)
+    """
+
+    gamma_shape = 1 / shape_parameter
+
+    return (maximum_conductance * sensitivity_parameter * gamma_shape * gamma(gamma_shape)
+            * gammainc(gamma_shape, power(water_potentials / sensitivity_parameter, shape_parameter)))
+
+
 def cumulative_Weibull_distribution_from_conductance_loss_at_given_water_potentials(
         maximum_conductance,
         water_potential_1,
@@ -5,7 +5,9 @@
 """
 
 from numpy import exp, power, log, abs
-from numpy import linspace, trapz
+from numpy import linspace, trapz, concatenate, cumsum
+from numpy import asarray, newaxis, broadcast_to, broadcast_shapes, broadcast_arrays
+from numpy import where, clip, errstate, nan
 
 
 class HydraulicConductanceModel:
@@ -76,18 +78,114 @@ class HydraulicConductanceModel:
     def transpiration(self, min_water_potential, max_water_potential, steps = 100):
         """
         Calculates the transpiration rate across the water potentials using the trapezium integral approximation
-        @param min_water_potential: (MPa)
-        @param max_water_potential: (MPa)
+        @param min_water_potential: float or array (MPa)
+        @param max_water_potential: float or array (MPa)
         @param steps: number of steps for integral approximation (unitless)
         @return: (mmol m-2 s-1)
         """
 
-        water_potential_values = linspace(min_water_potential, max_water_potential, steps)
+        water_potential_values = linspace(min_water_potential, max_water_potential, steps, axis=-1)
 
         conductance_values = self.conductance(water_potential_values)
 
         return trapz(conductance_values, water_potential_values)
 
+    def transpiration_as_a_function_of_leaf_water_potential(self, leaf_water_potentials, soil_water_potential):
+        """
+        Calculates the transpiration rate from the soil water potential to each of the leaf water potentials using a
+        single cumulative integral of the conductance (the supply curve). Each interval between neighbouring water
+        potentials is integrated with Simpson's rule, so the conductance is only evaluated at the given water potentials
+        and the interval midpoints.
+        @param leaf_water_potentials: numpy array with the leaf water potentials along the last axis, best ordered away
+                                      from the soil water potential (MPa)
+        @param soil_water_potential: float or array broadcasting against the other axes (MPa)
+        @return: array of transpiration rates (mmol m-2 s-1)
+        """
+
+        # Leaf water potentials run along the last axis, with the soil water potential prepended
+        soil_water_potential = asarray(soil_water_potential, dtype=float)[..., newaxis]
+        leaf_water_potentials = asarray(leaf_water_potentials, dtype=float)
+        water_potential_shape = broadcast_shapes(soil_water_potential.shape, leaf_water_potentials.shape)
+
+        water_potential_values = concatenate((broadcast_to(soil_water_potential,
+                                                           water_potential_shape[:-1] + (1,)),
+                                              broadcast_to(leaf_water_potentials, water_potential_shape)),
+                                             axis=-1)
+        midpoint_water_potential_values = (water_potential_values[..., 1:] + water_potential_values[..., :-1]) / 2
+
+        conductance_values = self.conductance(water_potential_values)
+        midpoint_conductance_values = self.conductance(midpoint_water_potential_values)
+
+        interval_transpiration = ((water_potential_values[..., :-1] - water_potential_values[..., 1:])
+                                  * (conductance_values[..., :-1]
+                                     + 4 * midpoint_conductance_values
+                                     + conductance_values[..., 1:]) / 6)
+
+        return cumsum(interval_transpiration, axis=-1)
+
+    def leaf_water_potential_from_transpiration(self,
+                                                transpiration_rates,
+                                                soil_water_potential,
+                                                tolerance = 1e-10,
+                                                maximum_iterations = 50):
+        """
+        Inverts the supply function, i.e. finds the leaf water potentials at which the transpiration from the soil
+        water potential equals the given transpiration rates. Uses Newton-Raphson steps, with the conductance as the
+        exact derivative of the transpiration, safeguarded by bisection of a bracket around the solution.
+        @param transpiration_rates: float or array (mmol m-2 s-1)
+        @param soil_water_potential: float or array broadcasting against the transpiration rates (MPa)
+        @param tolerance: (MPa)
+        @param maximum_iterations: (unitless)
+        @return: leaf water potentials (MPa), nan where the transpiration rate can not be reached
+        """
+
+        transpiration_rates, soil_water_potential = broadcast_arrays(asarray(transpiration_rates, dtype=float),
+                                                                     asarray(soil_water_potential, dtype=float))
+
+        # Bracket the solutions. The transpiration increases as the leaf water potential decreases.
+        upper_water_potential = soil_water_potential.copy()
+        lower_water_potential = soil_water_potential - 1.
+        unbracketed = self.transpiration(lower_water_potential, soil_water_potential) < transpiration_rates
+        for i in range(10):
+            if(not unbracketed.any()):
+                break
+            upper_water_potential = where(unbracketed, lower_water_potential, upper_water_potential)
+            lower_water_potential = where(unbracketed,
+                                          2 * lower_water_potential - soil_water_potential,
+                                          lower_water_potential)
+            unbracketed = self.transpiration(lower_water_potential, soil_water_potential) < transpiration_rates
+
+        # Initial guess assuming a constant conductance
+        leaf_water_potential = clip(soil_water_potential
+                                    - transpiration_rates / self.conductance(soil_water_potential),
+                                    lower_water_potential,
+                                    upper_water_potential)
+
+        for i in range(maximum_iterations):
+            transpiration_error = (self.transpiration(leaf_water_potential, soil_water_potential)
+                                   - transpiration_rates)
+
+            upper_water_potential = where(transpiration_error < 0, leaf_water_potential, upper_water_potential)
+            lower_water_potential = where(transpiration_error >= 0, leaf_water_potential, lower_water_potential)
+
+            with errstate(divide='ignore', invalid='ignore'):
+                newton_water_potential = (leaf_water_potential
+                                          + transpiration_error / self.conductance(leaf_water_potential))
+
+            # Bisect where the Newton step leaves the bracket
+            new_leaf_water_potential = where((newton_water_potential >= lower_water_potential)
+                                             & (newton_water_potential <= upper_water_potential),
+                                             newton_water_potential,
+                                             (lower_water_potential + upper_water_potential) / 2)
+
+            converged = abs(new_leaf_water_potential - leaf_water_potential) <= tolerance
+            leaf_water_potential = new_leaf_water_potential
+
+            if((converged | unbracketed).all()):
+                break
+
+        return where(unbracketed, nan, leaf_water_potential)[()]
+
     def update_xylem_damage(self, water_potential, timestep, transpiration_rate, root_water_potential):
         """
         @param water_potential: (MPa)
@@ -132,6 +230,17 @@ class HydraulicConductanceModel:
         """
         return None
 
+    @property
+    def is_dynamic(self):
+        """
+        @return: bool, False if update_xylem_damage can never change the model
+        """
+        model_class = type(self)
+
+        return (model_class.update_xylem_damage is not HydraulicConductanceModel.update_xylem_damage
+                or model_class._damage_xylem is not HydraulicConductanceModel._damage_xylem
+                or model_class._recover_xylem is not HydraulicConductanceModel._recover_xylem)
+
     @property
     def maximum_conductance(self):
         """
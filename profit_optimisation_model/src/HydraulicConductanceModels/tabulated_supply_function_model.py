@@ -0,0 +1,222 @@
+"""
+-----------------------------------------------------------------------------------------
+Caching layer for a hydraulic conductance model. The supply function, i.e. the integral
+of the conductance, is tabulated once on a fine water potential grid and transpiration
+is answered from the table as F(max) - F(min). The table is rebuilt when
+update_xylem_damage reports that the wrapped model has changed, or its maximum conductance has changed.
+-----------------------------------------------------------------------------------------
+"""
+
+from profit_optimisation_model.src.HydraulicConductanceModels.hydraulic_conductance_model \
+    import HydraulicConductanceModel
+from numpy import linspace, asarray, newaxis, isnan, amin, amax, any
+from scipy.interpolate import CubicHermiteSpline
+
+
+class TabulatedSupplyFunctionModel(HydraulicConductanceModel):
+
+    _base_conductance_model: HydraulicConductanceModel
+    _minimum_water_potential: float
+    _maximum_water_potential: float
+    _number_of_table_points: int
+    _supply_function: CubicHermiteSpline
+
+    def __init__(self,
+                 base_conductance_model: HydraulicConductanceModel,
+                 minimum_water_potential: float = -10.,
+                 maximum_water_potential: float = 0.,
+                 number_of_table_points: int = 2001):
+
+        """
+        The base conductance model must have a conductance that only depends on the water potential, so the
+        WholeTrunkImapirmentModel should wrap a tabulated model rather than be wrapped.
+        Between the table points the supply function is a cubic Hermite spline using the conductance as the exact
+        derivative. With the default table the error is below 1e-12 mmol m-2 s-1 for the Weibull and SOX curves and
+        around 1e-7 mmol m-2 s-1 where a capped conductance has a kink.
+
+        @param base_conductance_model: (HydraulicConductanceModel)
+        @param minimum_water_potential: lower end of the table, extended if a query lies below it (MPa)
+        @param maximum_water_potential: upper end of the table, extended if a query lies above it (MPa)
+        @param number_of_table_points: (unitless)
+        """
+
+        self._base_conductance_model = base_conductance_model
+        self._minimum_water_potential = minimum_water_potential
+        self._maximum_water_potential = maximum_water_potential
+        self._number_of_table_points = number_of_table_points
+        self._supply_function = None
+
+        super().__init__(base_conductance_model.maximum_conductance,
+                         base_conductance_model.critical_conductance_loss_fraction,
+                         base_conductance_model.xylem_recovery_water_potnetial,
+                         base_conductance_model.PLC_damage_threshold)
+
+    def conductance(self, water_potential, leaf_water_potential=None, soil_water_potential=None):
+
+        """
+        @param water_potential: (MPa)
+        @param leaf_water_potential: (MPa)
+        @param soil_water_potential: (MPa)
+        @return: conductance (mmol m-2 s-1 MPa-1)
+        """
+
+        return self._base_conductance_model.conductance(water_potential, leaf_water_potential, soil_water_potential)
+
+    def PLC(self, water_potential):
+        """
+        @param water_potential: (MPa)
+        @return: (unitless)
+        """
+        return self._base_conductance_model.PLC(water_potential)
+
+    def water_potential_from_conductivity_loss_fraction(self, conductivity_loss_fraction):
+        """
+        @param conductivity_loss_fraction: (unitless)
+        @return: (MPa)
+        """
+        return self._base_conductance_model.water_potential_from_conductivity_loss_fraction(conductivity_loss_fraction)
+
+    def water_potential_from_conductance(self, conductance):
+        """
+        @param conductance: (mmol m-2 s-1 MPa-1)
+        @return: (MPa)
+        """
+        return self._base_conductance_model.water_potential_from_conductance(conductance)
+
+    def supply_function(self, water_potential):
+        """
+        Integral of the conductance from the top of the table to the given water potential, interpolated from the
+        table. Only differences of the supply function are meaningful.
+        @param water_potential: (MPa)
+        @return: (mmol m-2 s-1)
+        """
+
+        water_potential = asarray(water_potential, dtype=float)
+        valid_water_potentials = ~isnan(water_potential)
+
+        minimum_water_potential = amin(water_potential, initial=self._minimum_water_potential,
+                                       where=valid_water_potentials)
+        maximum_water_potential = amax(water_potential, initial=self._maximum_water_potential,
+                                       where=valid_water_potentials)
+
+        if(self._supply_function is None
+                or minimum_water_potential < self._minimum_water_potential
+                or maximum_water_potential > self._maximum_water_potential):
+            self._minimum_water_potential = minimum_water_potential
+            self._maximum_water_potential = maximum_water_potential
+            self._tabulate_supply_function()
+
+        return self._supply_function(water_potential)
+
+    def transpiration(self, min_water_potential, max_water_potential, steps = 100):
+        """
+        Calculates the transpiration rate across the water potentials from the supply function table
+        @param min_water_potential: float or array (MPa)
+        @param max_water_potential: float or array (MPa)
+        @param steps: not used
+        @return: (mmol m-2 s-1)
+        """
+
+        return self.supply_function(max_water_potential) - self.supply_function(min_water_potential)
+
+    def transpiration_as_a_function_of_leaf_water_potential(self, leaf_water_potentials, soil_water_potential):
+        """
+        Calculates the transpiration rate from the soil water potential to each of the leaf water potentials from the
+        supply function table
+        @param leaf_water_potentials: numpy array with the leaf water potentials along the last axis (MPa)
+        @param soil_water_potential: float or array broadcasting against the other axes (MPa)
+        @return: array of transpiration rates (mmol m-2 s-1)
+        """
+
+        return (self.supply_function(asarray(soil_water_potential)[..., newaxis])
+                - self.supply_function(leaf_water_potentials))
+
+    def update_xylem_damage(self, water_potential, timestep, transpiration_rate, root_water_potential):
+        """
+        @param water_potential: (MPa)
+        @param timestep: (s)
+        @param transpiration_rate: (mmol m-2 s-1)
+        @param root_water_potential: (MPa)
+        @return: bool indicting if the model has changed
+        """
+
+        previous_maximum_conductance = self._base_conductance_model.maximum_conductance
+
+        model_changed = self._base_conductance_model.update_xylem_damage(water_potential,
+                                                                         timestep,
+                                                                         transpiration_rate,
+                                                                         root_water_potential)
+
+        # Also check the maximum conductance in case the base model does not report all of its changes
+        model_changed = bool(model_changed
+                             or any(self._base_conductance_model.maximum_conductance != previous_maximum_conductance))
+
+        if(model_changed):
+            self._supply_function = None
+
+        return model_changed
+
+    def reset_xylem_damage(self):
+        """
+        @return: None
+        """
+
+        self._base_conductance_model.reset_xylem_damage()
+        self._supply_function = None
+
+        return None
+
+    def _tabulate_supply_function(self):
+        """
+        Tabulates the supply function between the minimum and maximum water potentials
+        @return: None
+        """
+
+        water_potentials = linspace(self._maximum_water_potential,
+                                    self._minimum_water_potential,
+                                    self._number_of_table_points)
+
+        # Integral from each water potential up to the top of the table
+        transpiration = self._base_conductance_model.transpiration_as_a_function_of_leaf_water_potential(
+            water_potentials,
+            self._maximum_water_potential)
+
+        conductance = self._base_conductance_model.conductance(water_potentials)
+
+        self._supply_function = CubicHermiteSpline(water_potentials[::-1], -transpiration[::-1], conductance[::-1])
+
+    def get_base_conductance_model(self):
+
+        """
+        @return: (HydraulicConductanceModel)
+        """
+
+        return self._base_conductance_model
+
+    @property
+    def is_dynamic(self):
+        """
+        @return: bool, False if update_xylem_damage can never change the model
+        """
+        return self._base_conductance_model.is_dynamic
+
+    @property
+    def maximum_conductance(self):
+        """
+        @return: (mmol m-2 s-1 MPa-1)
+        """
+        return self._base_conductance_model.maximum_conductance
+
+    @property
+    def healthy_maximum_conductance(self):
+        """
+        @return: (mmol m-2 s-1 MPa-1)
+        """
+        return self._base_conductance_model.healthy_maximum_conductance
+
+    @property
+    def critical_conductance_loss_fraction(self):
+        """
+        @return: (unitless)
+        """
+        return self._base_conductance_model.critical_conductance_loss_fraction
@@ -6,11 +6,10 @@ by Gordon Bonan
 -------------------------------------------------------------------------
 """
 
-import numpy as np
-from numpy import roots, nanmax
+from numpy import where, full, shape, nan
 
 from profit_optimisation_model.src.PhotosynthesisModels.photosynthesis_model \
-    import PhotosynthesisModelDummy
+    import PhotosynthesisModelDummy, largest_quadratic_root
 from profit_optimisation_model.src.TemperatureDependenceModels.Q10_temperature_dependence_model \
     import Q10TemperatureDependenceModel
 from profit_optimisation_model.src.TemperatureDependenceModels.arrhenius_and_peaked_arrhenius_function \
@@ -32,6 +31,7 @@ class PhotosynthesisModelRubiscoLimitedBonan(PhotosynthesisModelDummy):
                  rubisco_rates_model=RubiscoRates(),
                  CO2_compensation_point_model=ArrheniusModel(42.75, 37830.0),
                  mitochondrial_respiration_rate_model=Q10TemperatureDependenceModel(0.2, 2.)):
+        super().__init__()
         self._rubisco_rates_model = rubisco_rates_model
         self._CO2_compensation_point_model = CO2_compensation_point_model
         self._mitochondrial_respiration_rate_model = mitochondrial_respiration_rate_model
@@ -45,25 +45,20 @@ class PhotosynthesisModelRubiscoLimitedBonan(PhotosynthesisModelDummy):
         """
 
 
-        @param stomatal_conductance_to_CO2: mol m-2 s-1
+        @param stomatal_conductance_to_CO2: mol m-2 s-1, float or numpy array
         @param atmospheric_CO2_concentration: umol mol-1
         @param leaf_temperature: K
         @param intercellular_O: umol mol-1
         @param utilized_photosynthetically_active_radiation: Not needed
-        @return: intercellular CO2 concentration (umol mol-1)
+        @return: intercellular CO2 concentration (umol mol-1), float or numpy array
         """
 
-        mitochondrial_respiration_rate = (
-            self._mitochondrial_respiration_rate_model.get_value_at_temperature(leaf_temperature))
-
-        michaelis_menten_constant_carboxylation = (
-            self._rubisco_rates_model.michaelis_menten_constant_carboxylation(leaf_temperature, intercellular_O))
-
-        maximum_carboxylation_rate = self._rubisco_rates_model.maximum_carboxylation_rate(leaf_temperature)
-
-        mitochondrial_respiration_rate = 0.015*maximum_carboxylation_rate
-
-        CO2_compensation_point = self._CO2_compensation_point_model.get_value_at_temperature(leaf_temperature)
+        (michaelis_menten_constant_carboxylation,
+         maximum_carboxylation_rate,
+         mitochondrial_respiration_rate,
+         CO2_compensation_point) = self.rate_parameters(leaf_temperature,
+                                                        intercellular_O,
+                                                        utilized_photosynthetically_active_radiation)
 
         # Quadratic equation components (Ax^2 + Bx + C = 0)
         A = -stomatal_conductance_to_CO2
@@ -77,17 +72,52 @@ class PhotosynthesisModelRubiscoLimitedBonan(PhotosynthesisModelDummy):
              + mitochondrial_respiration_rate * michaelis_menten_constant_carboxylation
              + CO2_compensation_point * maximum_carboxylation_rate)
 
-        # Find the roots of the quadratic equation
-        intercellular_CO2_concentration = roots([A, B, C])
+        # Find the largest root of the quadratic equation for every stomatal conductance
+        intercellular_CO2_concentration = largest_quadratic_root(A, B, C)
 
-        intercellular_CO2_concentration = nanmax(intercellular_CO2_concentration)
+        # Roots below zero or above the atmospheric CO2 concentration are not physical
+        return where((intercellular_CO2_concentration < 0.)
+                     | (intercellular_CO2_concentration > atmospheric_CO2_concentration),
+                     nan,
+                     intercellular_CO2_concentration)[()]
 
-        if(intercellular_CO2_concentration is None):
-            return np.nan
-        elif (intercellular_CO2_concentration < 0. or intercellular_CO2_concentration > atmospheric_CO2_concentration):
-            return np.nan
+    def _calculate_rate_parameters(self,
+                                   leaf_temperature,
+                                   intercellular_O = None,
+                                   utilized_photosynthetically_active_radiation = None):
+        """
 
-        return intercellular_CO2_concentration
+        @param leaf_temperature: K
+        @param intercellular_O: umol mol-1
+        @param utilized_photosynthetically_active_radiation: Not needed
+        @return: Michaelis-Menten constant for carboxylation (umol mol-1)
+        @return: maximum carboxylation rate (umol m-2 s-1)
+        @return: mitochondrial respiration rate (umol m-2 s-1)
+        @return: CO2 compensation point (umol mol-1)
+        """
+
+        michaelis_menten_constant_carboxylation = (
+            self._rubisco_rates_model.michaelis_menten_constant_carboxylation(leaf_temperature, intercellular_O))
+
+        maximum_carboxylation_rate = self._rubisco_rates_model.maximum_carboxylation_rate(leaf_temperature)
+
+        mitochondrial_respiration_rate = 0.015*maximum_carboxylation_rate
+
+        CO2_compensation_point = self._CO2_compensation_point_model.get_value_at_temperature(leaf_temperature)
+
+        return (michaelis_menten_constant_carboxylation,
+                maximum_carboxylation_rate,
+                mitochondrial_respiration_rate,
+                CO2_compensation_point)
+
+    def _rate_parameter_models_in_use(self):
+        """
+        @return: rubisco rates, CO2 compensation point and mitochondrial respiration rate models
+        """
+
+        return (self._rubisco_rates_model,
+                self._CO2_compensation_point_model,
+                self._mitochondrial_respiration_rate_model)
 
 
 class PhotosynthesisModelElectronTransportLimitedBonan(PhotosynthesisModelDummy):
@@ -111,6 +141,7 @@ class PhotosynthesisModelElectronTransportLimitedBonan(PhotosynthesisModelDummy)
         @param rubisco_rates_model:
         """
 
+        super().__init__()
         self._electron_transport_rate_model = electron_transport_rate_model
         self._CO2_compensation_point_model = CO2_compensation_point_model
         self._mitochondrial_respiration_rate_model = mitochondrial_respiration_rate_model
@@ -124,29 +155,22 @@ class PhotosynthesisModelElectronTransportLimitedBonan(PhotosynthesisModelDummy)
                                         utilized_photosynthetically_active_radiation = None):
         """
 
-        @param stomatal_conductance_to_CO2: mol m-2 s-1
+        @param stomatal_conductance_to_CO2: mol m-2 s-1, float or numpy array
         @param atmospheric_CO2_concentration: umol mol-1
         @param leaf_temperature: K
         @param intercellular_O: umol mol-1
         @param utilized_photosynthetically_active_radiation: (umol m-2 unit time-1)
-        @return: intercellular CO2 concentration (umol mol-1)
+        @return: intercellular CO2 concentration (umol mol-1), float or numpy array
         """
 
         if(utilized_photosynthetically_active_radiation == 0.):
-            return atmospheric_CO2_concentration
-
-        maximum_carboxylation_rate = self._rubisco_rates_model.maximum_carboxylation_rate(leaf_temperature)
+            return full(shape(stomatal_conductance_to_CO2), atmospheric_CO2_concentration)[()]
 
-        mitochondrial_respiration_rate = 0.015 * maximum_carboxylation_rate
-
-        #mitochondrial_respiration_rate = (
-        #    self._mitochondrial_respiration_rate_model.get_value_at_temperature(leaf_temperature))
-
-        electron_transport_rate = (
-            self._electron_transport_rate_model.electron_transport_rate(leaf_temperature,
-                                                                        utilized_photosynthetically_active_radiation))
-
-        CO2_compensation_point = self._CO2_compensation_point_model.get_value_at_temperature(leaf_temperature)
+        (mitochondrial_respiration_rate,
+         electron_transport_rate,
+         CO2_compensation_point) = self.rate_parameters(leaf_temperature,
+                                                        intercellular_O,
+                                                        utilized_photosynthetically_active_radiation)
 
         # Quadratic equation components (Ax^2 + Bx + C = 0)
         A = -stomatal_conductance_to_CO2
@@ -160,15 +184,59 @@ class PhotosynthesisModelElectronTransportLimitedBonan(PhotosynthesisModelDummy)
              + 2 * mitochondrial_respiration_rate * CO2_compensation_point
              + CO2_compensation_point * CO2_compensation_point / 4)
 
-        # Find the roots of the quadratic equation
-        intercellular_CO2_concentration = roots([A, B, C])
+        # Find the largest root of the quadratic equation for every stomatal conductance
+        intercellular_CO2_concentration = largest_quadratic_root(A, B, C)
+
+        # Roots below zero or above the atmospheric CO2 concentration are not physical
+        return where((intercellular_CO2_concentration < 0.)
+                     | (intercellular_CO2_concentration > atmospheric_CO2_concentration),
+                     nan,
+                     intercellular_CO2_concentration)[()]
+
+    def _calculate_rate_parameters(self,
+                                   leaf_temperature,
+                                   intercellular_O = None,
+                                   utilized_photosynthetically_active_radiation = None):
+        """
+
+        @param leaf_temperature: K
+        @param intercellular_O: Not needed
+        @param utilized_photosynthetically_active_radiation: (umol m-2 unit time-1)
+        @return: mitochondrial respiration rate (umol m-2 s-1)
+        @return: electron transport rate (umol m-2 s-1)
+        @return: CO2 compensation point (umol mol-1)
+        """
+
+        maximum_carboxylation_rate = self._rubisco_rates_model.maximum_carboxylation_rate(leaf_temperature)
+
+        mitochondrial_respiration_rate = 0.015 * maximum_carboxylation_rate
+
+        #mitochondrial_respiration_rate = (
+        #    self._mitochondrial_respiration_rate_model.get_value_at_temperature(leaf_temperature))
+
+        electron_transport_rate = (
+            self._electron_transport_rate_model.electron_transport_rate(leaf_temperature,
+                                                                        utilized_photosynthetically_active_radiation))
+
+        CO2_compensation_point = self._CO2_compensation_point_model.get_value_at_temperature(leaf_temperature)
+
+        return mitochondrial_respiration_rate, electron_transport_rate, CO2_compensation_point
 
-        intercellular_CO2_concentration = nanmax(intercellular_CO2_concentration)
+    def _rate_parameter_models_in_use(self):
+        """
+        @return: electron transport rate, CO2 compensation point, mitochondrial respiration rate and rubisco rates
+                 models
+        """
 
-        if (intercellular_CO2_concentration is None):
-            return np.nan
-        elif (intercellular_CO2_concentration < 0. or intercellular_CO2_concentration > atmospheric_CO2_concentration):
-            return np.nan
+        return (self._electron_transport_rate_model,
+                self._CO2_compensation_point_model,
+                self._mitochondrial_respiration_rate_model,
+                self._rubisco_rates_model)
 
-        return intercellular_CO2_concentration
-        #return max(intercellular_CO2_concentration)
+    @property
+    def closed_without_light(self):
+        """
+        @return: bool, True as the intercellular CO2 concentration is the atmospheric CO2 concentration at every
+                 stomatal conductance when there is no light
+        """
+        return True
@@ -7,11 +7,219 @@
 import math
 import numpy as np
 
-from numpy import nanmax
+from numpy import asarray, broadcast_arrays, broadcast_to, where, sqrt, fmax, fmin, errstate, nan, ndarray
 
 
 class PhotosynthesisModelDummy:
 
+    # Temperature, oxygen and light dependent parameters, the conditions and rate models they were calculated with
+    _rate_parameters: tuple
+    _rate_parameter_conditions: tuple
+    _rate_parameter_models: tuple
+
+    # Rate parameters precomputed for each time step's conditions, see precompute_rate_parameters
+    _precomputed_rate_parameters: dict
+    _precomputed_rate_parameter_models: tuple
+
+    def __init__(self):
+        self._rate_parameters = None
+        self._rate_parameter_conditions = None
+        self._rate_parameter_models = None
+        self._precomputed_rate_parameters = None
+        self._precomputed_rate_parameter_models = None
+
+    def rate_parameters(self,
+                        leaf_temperature,
+                        intercellular_O = None,
+                        utilized_photosynthetically_active_radiation = None):
+
+        """
+        Parameters of the model that only depend on the conditions, not on the stomatal conductance. They are kept
+        for the last conditions, so within a time step they are only calculated once. Arrays of conditions are not
+        kept. Parameters precomputed for the conditions with precompute_rate_parameters are used without
+        recalculating. Kept parameters are recalculated if one of the rate models is replaced (see
+        _rate_parameter_models_in_use). Call clear_rate_parameters after changing a rate model in place.
+
+        @param leaf_temperature: K
+        @param intercellular_O: umol mol-1
+        @param utilized_photosynthetically_active_radiation: (umol m-2 unit time-1)
+        @return: tuple of rate parameters, see _calculate_rate_parameters of the model
+        """
+
+        conditions = (leaf_temperature, intercellular_O, utilized_photosynthetically_active_radiation)
+
+        if(isinstance(leaf_temperature, ndarray)
+                or isinstance(intercellular_O, ndarray)
+                or isinstance(utilized_photosynthetically_active_radiation, ndarray)):
+            return self._calculate_rate_parameters(*conditions)
+
+        rate_models = self._rate_parameter_models_in_use()
+
+        if(self._rate_parameters is None
+                or conditions != self._rate_parameter_conditions
+                or rate_models != self._rate_parameter_models):
+            if(self._precomputed_rate_parameters is not None
+                    and rate_models == self._precomputed_rate_parameter_models
+                    and conditions in self._precomputed_rate_parameters):
+                self._rate_parameters = self._precomputed_rate_parameters[conditions]
+            else:
+                self._rate_parameters = self._calculate_rate_parameters(*conditions)
+            self._rate_parameter_conditions = conditions
+            self._rate_parameter_models = rate_models
+
+        return self._rate_parameters
+
+    def precompute_rate_parameters(self,
+                                   leaf_temperature_values,
+                                   intercellular_O_values = None,
+                                   utilized_photosynthetically_active_radiation_values = None):
+
+        """
+        Calculates the rate parameters for a whole timeseries of conditions, e.g. the forcing of a model run, in one
+        vectorised pass. They are kept for the conditions of each time step, so rate_parameters does not recalculate
+        them as the time steps are run. Replaces any previously precomputed rate parameters. The returned arrays can
+        be saved, e.g. per site, and given back with set_precomputed_rate_parameters. Models that do not implement
+        _calculate_rate_parameters are left to calculate their rates in each time step.
+
+        @param leaf_temperature_values: numpy array, K
+        @param intercellular_O_values: numpy array or None, umol mol-1
+        @param utilized_photosynthetically_active_radiation_values: numpy array or None, (umol m-2 unit time-1)
+        @return: tuple of arrays of rate parameters with a value for each time step, None if the model does not
+                 implement _calculate_rate_parameters
+        """
+
+        if(not self.has_rate_parameters):
+            self._precomputed_rate_parameters = None
+            return None
+
+        condition_values = self._rate_parameter_condition_values(leaf_temperature_values,
+                                                                 intercellular_O_values,
+                                                                 utilized_photosynthetically_active_radiation_values)
+
+        return self.set_precomputed_rate_parameters(leaf_temperature_values,
+                                                    intercellular_O_values,
+                                                    utilized_photosynthetically_active_radiation_values,
+                                                    self._calculate_rate_parameters(*condition_values))
+
+    def set_precomputed_rate_parameters(self,
+                                        leaf_temperature_values,
+                                        intercellular_O_values,
+                                        utilized_photosynthetically_active_radiation_values,
+                                        rate_parameter_values):
+
+        """
+        Keeps rate parameters that have already been calculated for a timeseries of conditions, e.g. by
+        precompute_rate_parameters and loaded from a per site cache, so they are not recalculated. Replaces any
+        previously precomputed rate parameters.
+
+        @param leaf_temperature_values: numpy array, K
+        @param intercellular_O_values: numpy array or None, umol mol-1
+        @param utilized_photosynthetically_active_radiation_values: numpy array or None, (umol m-2 unit time-1)
+        @param rate_parameter_values: tuple of arrays of rate parameters with a value for each time step, as returned
+                                      by precompute_rate_parameters, or None to calculate them in each time step
+        @return: tuple of arrays of rate parameters with a value for each time step
+        """
+
+        if(rate_parameter_values is None):
+            self._precomputed_rate_parameters = None
+            return None
+
+        condition_values = self._rate_parameter_condition_values(leaf_temperature_values,
+                                                                 intercellular_O_values,
+                                                                 utilized_photosynthetically_active_radiation_values)
+
+        leaf_temperature_values = condition_values[0]
+
+        rate_parameter_values = tuple(broadcast_to(values, leaf_temperature_values.shape)
+                                      for values in rate_parameter_values)
+
+        # Key the parameters on the conditions rate_parameters is called with in each time step
+        conditions = zip(*([None] * len(leaf_temperature_values) if values is None else values.tolist()
+                           for values in condition_values))
+
+        self._precomputed_rate_parameters = dict(zip(conditions,
+                                                     zip(*(values.tolist() for values in rate_parameter_values))))
+        self._precomputed_rate_parameter_models = self._rate_parameter_models_in_use()
+
+        return rate_parameter_values
+
+    def _rate_parameter_condition_values(self,
+                                         leaf_temperature_values,
+                                         intercellular_O_values = None,
+                                         utilized_photosynthetically_active_radiation_values = None):
+
+        """
+        @param leaf_temperature_values: numpy array, K
+        @param intercellular_O_values: numpy array or None, umol mol-1
+        @param utilized_photosynthetically_active_radiation_values: numpy array or None, (umol m-2 unit time-1)
+        @return: list of the conditions as arrays of the same shape, or None
+        """
+
+        leaf_temperature_values = asarray(leaf_temperature_values, dtype=float)
+
+        condition_values = [leaf_temperature_values]
+        for values in (intercellular_O_values, utilized_photosynthetically_active_radiation_values):
+            condition_values.append(None if values is None
+                                    else broadcast_to(asarray(values, dtype=float), leaf_temperature_values.shape))
+
+        return condition_values
+
+    @property
+    def has_rate_parameters(self):
+        """
+        @return: bool, True if the model implements _calculate_rate_parameters so its rate parameters can be
+                 precomputed
+        """
+        return type(self)._calculate_rate_parameters is not PhotosynthesisModelDummy._calculate_rate_parameters
+
+    def clear_rate_parameters(self):
+        """
+        Forget the kept and precomputed rate parameters, so they are recalculated on the next call.
+        @return: None
+        """
+
+        self._rate_parameters = None
+        self._rate_parameter_conditions = None
+        self._rate_parameter_models = None
+        self._precomputed_rate_parameters = None
+        self._precomputed_rate_parameter_models = None
+
+        return None
+
+    def _rate_parameter_models_in_use(self):
+        """
+        The models the rate parameters are calculated from. Kept and precomputed rate parameters are only used while
+        the same models are in use.
+        @return: tuple of models
+        """
+
+        return ()
+
+    def _calculate_rate_parameters(self,
+                                   leaf_temperature,
+                                   intercellular_O = None,
+                                   utilized_photosynthetically_active_radiation = None):
+
+        """
+
+        @param leaf_temperature: K
+        @param intercellular_O: umol mol-1
+        @param utilized_photosynthetically_active_radiation: (umol m-2 unit time-1)
+        @return: tuple of rate parameters
+        """
+
+        raise Exception("_calculate_rate_parameters method not implemented in PhotosynthesisModelDummy class")
+
+    @property
+    def closed_without_light(self):
+        """
+        True only for models where, when there is no light, the intercellular CO2 concentration is at least the
+        atmospheric CO2 concentration at every stomatal conductance. The optimal state then has closed stomata, so the
+        profit curve does not need to be sampled.
+        @return: bool
+        """
+        return False
+
     def intercellular_CO2_concentration(self,
                                         stomatal_conductance_to_CO2,
                                         atmospheric_CO2_concentration,
@@ -67,9 +275,105 @@ class PhotosynthesisModel(PhotosynthesisModelDummy):
     def __init__(self,
                  photosynthesis_rubisco_limited_model,
                  photosynthesis_electron_transport_limited_model):
+        super().__init__()
         self._photosynthesis_rubisco_limited_model = photosynthesis_rubisco_limited_model
         self._photosynthesis_electron_transport_limited_model = photosynthesis_electron_transport_limited_model
 
+    def rate_parameters(self,
+                        leaf_temperature,
+                        intercellular_O = None,
+                        utilized_photosynthetically_active_radiation = None):
+
+        """
+
+        @param leaf_temperature: K
+        @param intercellular_O: umol mol-1
+        @param utilized_photosynthetically_active_radiation: (umol m-2 unit time-1)
+        @return: rubisco limited rate parameters
+        @return: electron transport limited rate parameters
+        """
+
+        return (self._photosynthesis_rubisco_limited_model.rate_parameters(
+                    leaf_temperature, intercellular_O, utilized_photosynthetically_active_radiation),
+                self._photosynthesis_electron_transport_limited_model.rate_parameters(
+                    leaf_temperature, intercellular_O, utilized_photosynthetically_active_radiation))
+
+    def precompute_rate_parameters(self,
+                                   leaf_temperature_values,
+                                   intercellular_O_values = None,
+                                   utilized_photosynthetically_active_radiation_values = None):
+
+        """
+
+        @param leaf_temperature_values: numpy array, K
+        @param intercellular_O_values: numpy array or None, umol mol-1
+        @param utilized_photosynthetically_active_radiation_values: numpy array or None, (umol m-2 unit time-1)
+        @return: rubisco limited rate parameter arrays
+        @return: electron transport limited rate parameter arrays
+        """
+
+        return (self._photosynthesis_rubisco_limited_model.precompute_rate_parameters(
+                    leaf_temperature_values, intercellular_O_values,
+                    utilized_photosynthetically_active_radiation_values),
+                self._photosynthesis_electron_transport_limited_model.precompute_rate_parameters(
+                    leaf_temperature_values, intercellular_O_values,
+                    utilized_photosynthetically_active_radiation_values))
+
+    def set_precomputed_rate_parameters(self,
+                                        leaf_temperature_values,
+                                        intercellular_O_values,
+                                        utilized_photosynthetically_active_radiation_values,
+                                        rate_parameter_values):
+
+        """
+
+        @param leaf_temperature_values: numpy array, K
+        @param intercellular_O_values: numpy array or None, umol mol-1
+        @param utilized_photosynthetically_active_radiation_values: numpy array or None, (umol m-2 unit time-1)
+        @param rate_parameter_values: rubisco limited and electron transport limited rate parameter arrays, as
+                                      returned by precompute_rate_parameters
+        @return: rubisco limited rate parameter arrays
+        @return: electron transport limited rate parameter arrays
+        """
+
+        rubisco_limited_rate_parameter_values, electron_transport_limited_rate_parameter_values = rate_parameter_values
+
+        return (self._photosynthesis_rubisco_limited_model.set_precomputed_rate_parameters(
+                    leaf_temperature_values, intercellular_O_values,
+                    utilized_photosynthetically_active_radiation_values, rubisco_limited_rate_parameter_values),
+                self._photosynthesis_electron_transport_limited_model.set_precomputed_rate_parameters(
+                    leaf_temperature_values, intercellular_O_values,
+                    utilized_photosynthetically_active_radiation_values,
+                    electron_transport_limited_rate_parameter_values))
+
+    @property
+    def has_rate_parameters(self):
+        """
+        @return: bool, True if either model's rate parameters can be precomputed
+        """
+        return (self._photosynthesis_rubisco_limited_model.has_rate_parameters
+                or self._photosynthesis_electron_transport_limited_model.has_rate_parameters)
+
+    def clear_rate_parameters(self):
+        """
+        @return: None
+        """
+
+        self._photosynthesis_rubisco_limited_model.clear_rate_parameters()
+        self._photosynthesis_electron_transport_limited_model.clear_rate_parameters()
+
+        return None
+
+    @property
+    def closed_without_light(self):
+        """
+        The co-limited intercellular CO2 concentration is the larger of the two, so it is at least the atmospheric CO2
+        concentration if either model's is.
+        @return: bool
+        """
+        return (self._photosynthesis_rubisco_limited_model.closed_without_light
+                or self._photosynthesis_electron_transport_limited_model.closed_without_light)
+
     def intercellular_CO2_concentration(self,
                                         stomatal_conductance_to_CO2,
                                         atmospheric_CO2_concentration,
@@ -100,7 +404,9 @@ class PhotosynthesisModel(PhotosynthesisModelDummy):
         elif(intercellular_CO2_electron_transport_limited is None):
             return intercellular_CO2_rubisco_limited
 
-        return nanmax([intercellular_CO2_rubisco_limited, intercellular_CO2_electron_transport_limited])
+        # Co-limitation: the limiting process is the one with the larger intercellular CO2 concentration. Evaluated
+        # element wise so whole arrays of stomatal conductance are handled at once.
+        return fmax(intercellular_CO2_rubisco_limited, intercellular_CO2_electron_transport_limited)
 
 
 def quadratic(a=None, b=None, c=None, large=False):
@@ -148,3 +454,84 @@ def quadratic(a=None, b=None, c=None, large=False):
             root = (-b - np.sqrt(d)) / (2.0 * a)
 
     return root
+
+
+def quadratic_roots(a, b, c):
+    """
+    Vectorised, numerically stable solution for the real roots of a*x^2 + b*x + c = 0. Avoids the cancellation of the
+    textbook formula by calculating q = -(b + sign(b) * sqrt(b^2 - 4ac)) / 2 and using the roots q / a and c / q.
+    Where a is zero the first root is nan, so only the linear root -c / b remains. Where there is no real root both
+    roots are nan.
+
+    Parameters:
+    ----------
+    a : float or numpy array
+        co-efficient
+    b : float or numpy array
+        co-efficient
+    c : float or numpy array
+        co-efficient
+
+    Returns:
+    -------
+    root1 : numpy array
+        q / a
+    root2 : numpy array
+        c / q
+    """
+    a, b, c = broadcast_arrays(asarray(a, dtype=float), asarray(b, dtype=float), asarray(c, dtype=float))
+
+    d = b ** 2.0 - 4.0 * a * c  # discriminant
+
+    with errstate(invalid='ignore', divide='ignore'):
+        # The square root of a negative discriminant is nan so complex roots propagate as nan
+        q = -0.5 * (b + where(b >= 0.0, 1.0, -1.0) * sqrt(d))
+
+        root1 = where(a != 0.0, q / a, nan)
+        root2 = where(q != 0.0, c / q, nan)
+
+    return root1, root2
+
+
+def largest_quadratic_root(a, b, c):
+    """
+    Largest real root of a*x^2 + b*x + c = 0, see quadratic_roots. Where there is no real root nan is returned.
+
+    Parameters:
+    ----------
+    a : float or numpy array
+        co-efficient
+    b : float or numpy array
+        co-efficient
+    c : float or numpy array
+        co-efficient
+
+    Returns:
+    -------
+    val : float or numpy array
+        largest real root
+    """
+
+    return fmax(*quadratic_roots(a, b, c))[()]
+
+
+def smallest_quadratic_root(a, b, c):
+    """
+    Smallest real root of a*x^2 + b*x + c = 0, see quadratic_roots. Where there is no real root nan is returned.
+
+    Parameters:
+    ----------
+    a : float or numpy array
+        co-efficient
+    b : float or numpy array
+        co-efficient
+    c : float or numpy array
+        co-efficient
+
+    Returns:
+    -------
+    val : float or numpy array
+        smallest real root
+    """
+
+    return fmin(*quadratic_roots(a, b, c))[()]
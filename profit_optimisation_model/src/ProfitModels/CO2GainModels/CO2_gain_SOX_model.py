@@ -9,5 +9,5 @@ from profit_optimisation_model.src.ProfitModels.CO2GainModels.CO2_gain_model imp
 
 class SOXCO2GainModel(CO2GainModelDummy):
 
-    def gain_equation(self, net_CO2_uptake):
+    def gain_equation(self, net_CO2_uptake, maximum_net_CO2_uptake = None):
         return net_CO2_uptake
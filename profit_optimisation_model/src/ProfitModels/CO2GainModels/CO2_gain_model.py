@@ -4,7 +4,7 @@
 -------------------------------------------------------------------------
 """
 
-from numpy import zeros
+from numpy import asarray
 from profit_optimisation_model.src.leaf_air_coupling_model import LeafAirCouplingModel
 from profit_optimisation_model.src.PhotosynthesisModels.photosynthesis_model import PhotosynthesisModelDummy
 from profit_optimisation_model.src.conversions import magnitude_conversion
@@ -27,16 +27,19 @@ class CO2GainModelDummy:
                  air_pressure,
                  atmospheric_CO2_concentration,
                  intercellular_O = None,
-                 photosyntheticaly_active_radiation = None):
+                 photosyntheticaly_active_radiation = None,
+                 maximum_net_CO2_uptake = None):
         """
 
-        @param transpiration_rates: mmol m-2 s-1
+        @param transpiration_rates: numpy array, mmol m-2 s-1
         @param air_temperature: K
         @param air_vapour_pressure_deficit: kPa
         @param air_pressure: kPa
         @param atmospheric_CO2_concentration: umol mol-1
         @param intercellular_O: umol mol-1
         @param photosyntheticaly_active_radiation: umol m-2 s-1
+        @param maximum_net_CO2_uptake: umol m-2 s-1. Net CO2 uptake used to normalise the gain. If None it is taken
+                                       from the transpiration rates given.
 
         @return: normalised CO2 gain
         @return: maximum CO2 gain: umol m-2 s-1
@@ -44,36 +47,88 @@ class CO2GainModelDummy:
         @return: stomatal conductance to CO2: mol m-2 s-1
         """
 
-        net_CO2_uptake = zeros(len(transpiration_rates))
-        intercellular_CO2_as_a_function_of_leaf_water_potential = zeros(len(transpiration_rates))
-        stomatal_conductance_to_CO2_as_a_function_of_leaf_water_potential = zeros(len(transpiration_rates))
+        # The whole array of transpiration rates is passed through each step at once
+        stomatal_conductance_to_CO2_as_a_function_of_leaf_water_potential = \
+            self._leaf_air_coupling_model.stomatal_conductance_to_carbon(asarray(transpiration_rates),
+                                                                         air_temperature,
+                                                                         air_vapour_pressure_deficit,
+                                                                         air_pressure)
 
-        for i in range(len(transpiration_rates)):
-            stomatal_conductance_to_CO2 = \
-                self._leaf_air_coupling_model.stomatal_conductance_to_carbon(transpiration_rates[i],
-                                                                             air_temperature,
-                                                                             air_vapour_pressure_deficit,
-                                                                             air_pressure)
+        # Need to convert from mmol m-2 s-1 to mol m-2 s-1
+        stomatal_conductance_to_CO2_as_a_function_of_leaf_water_potential = \
+            magnitude_conversion(stomatal_conductance_to_CO2_as_a_function_of_leaf_water_potential, 'm', '')
 
-            # Need to convert from mmol m-2 s-1 to mol m-2 s-1
-            stomatal_conductance_to_CO2 = magnitude_conversion(stomatal_conductance_to_CO2, 'm', '')
+        (net_CO2_uptake,
+         intercellular_CO2_as_a_function_of_leaf_water_potential) = \
+            self._photosynthesis_model.net_rate_of_CO2_assimilation(
+                stomatal_conductance_to_CO2_as_a_function_of_leaf_water_potential,
+                atmospheric_CO2_concentration,
+                air_temperature,
+                intercellular_O,
+                photosyntheticaly_active_radiation)
 
-            (net_CO2_uptake[i],
-            intercellular_CO2_as_a_function_of_leaf_water_potential[i]) = \
-                self._photosynthesis_model.net_rate_of_CO2_assimilation(stomatal_conductance_to_CO2,
-                                                                        atmospheric_CO2_concentration,
-                                                                        air_temperature,
-                                                                        intercellular_O,
-                                                                        photosyntheticaly_active_radiation)
-
-            stomatal_conductance_to_CO2_as_a_function_of_leaf_water_potential[i] = stomatal_conductance_to_CO2
-
-        CO2_gain = self.gain_equation(net_CO2_uptake)
+        CO2_gain = self.gain_equation(net_CO2_uptake, maximum_net_CO2_uptake)
 
         return (CO2_gain,
                 net_CO2_uptake,
                 intercellular_CO2_as_a_function_of_leaf_water_potential,
                 stomatal_conductance_to_CO2_as_a_function_of_leaf_water_potential)
 
-    def gain_equation(self, net_CO2_uptake):
+    def precompute_rate_parameters(self,
+                                   air_temperature_values,
+                                   intercellular_O_values = None,
+                                   photosyntheticaly_active_radiation_values = None):
+        """
+        Calculates the photosynthesis rate parameters for a whole forcing timeseries ahead of the time steps. The
+        leaf temperature is taken to be the air temperature, as in CO2_gain. See
+        PhotosynthesisModelDummy.precompute_rate_parameters.
+
+        @param air_temperature_values: numpy array, K
+        @param intercellular_O_values: numpy array, umol mol-1
+        @param photosyntheticaly_active_radiation_values: numpy array, umol m-2 s-1
+        @return: rate parameter arrays of the photosynthesis model
+        """
+
+        return self._photosynthesis_model.precompute_rate_parameters(air_temperature_values,
+                                                                     intercellular_O_values,
+                                                                     photosyntheticaly_active_radiation_values)
+
+    def set_precomputed_rate_parameters(self,
+                                        air_temperature_values,
+                                        intercellular_O_values,
+                                        photosyntheticaly_active_radiation_values,
+                                        rate_parameter_values):
+        """
+        Gives rate parameters already calculated for the forcing, e.g. loaded from a per site cache, to the
+        photosynthesis model. See PhotosynthesisModelDummy.set_precomputed_rate_parameters.
+
+        @param air_temperature_values: numpy array, K
+        @param intercellular_O_values: numpy array, umol mol-1
+        @param photosyntheticaly_active_radiation_values: numpy array, umol m-2 s-1
+        @param rate_parameter_values: rate parameter arrays, as returned by precompute_rate_parameters
+        @return: rate parameter arrays of the photosynthesis model
+        """
+
+        return self._photosynthesis_model.set_precomputed_rate_parameters(air_temperature_values,
+                                                                          intercellular_O_values,
+                                                                          photosyntheticaly_active_radiation_values,
+                                                                          rate_parameter_values)
+
+    def clear_rate_parameters(self):
+        """
+        @return: None
+        """
+
+        return self._photosynthesis_model.clear_rate_parameters()
+
+    @property
+    def closed_without_light(self):
+        """
+        Models that change how the intercellular CO2 concentration is found must override this.
+        @return: bool, True if the photosynthesis model has closed stomata when there is no light, see
+                 PhotosynthesisModelDummy.closed_without_light
+        """
+        return self._photosynthesis_model.closed_without_light
+
+    def gain_equation(self, net_CO2_uptake, maximum_net_CO2_uptake = None):
         raise Exception("gain equation not implemented in dummy class.")
@@ -9,8 +9,12 @@ from profit_optimisation_model.src.ProfitModels.CO2GainModels.CO2_gain_model imp
 
 class ProfitMaxCO2GainModel(CO2GainModelDummy):
 
-    def gain_equation(self, net_CO2_uptake):
-        maximum_CO2_uptake = nanmax(net_CO2_uptake)
+    def gain_equation(self, net_CO2_uptake, maximum_net_CO2_uptake = None):
+        maximum_CO2_uptake = maximum_net_CO2_uptake
+
+        # Normalise by the largest uptake of the given values unless the maximum is supplied
+        if(maximum_CO2_uptake is None):
+            maximum_CO2_uptake = nanmax(net_CO2_uptake)
 
         if(maximum_CO2_uptake > 0.):
             return net_CO2_uptake/maximum_CO2_uptake
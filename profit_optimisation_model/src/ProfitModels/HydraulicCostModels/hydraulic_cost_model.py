@@ -83,6 +83,18 @@ class HydraulicCostModel:
         """
         return self._hydraulic_conductance_model.transpiration(min_water_potential, max_water_potential, steps)
 
+    def transpiration_as_a_function_of_leaf_water_potential(self, leaf_water_potentials, soil_water_potential):
+        """
+        Calculates the transpiration rate at each leaf water potential using a single cumulative integral.
+        Simply calls the same method from the hydraulic conductance model
+        @param leaf_water_potentials: 1d numpy array (MPa)
+        @param soil_water_potential: float (MPa)
+        @return: array of transpiration rates (mmol m-2 s-1)
+        """
+        return self._hydraulic_conductance_model.transpiration_as_a_function_of_leaf_water_potential(
+            leaf_water_potentials,
+            soil_water_potential)
+
     def update_xylem_damage(self, water_potential, timestep, transpiration_rate, root_water_potential):
         """
         @param water_potential: (MPa)
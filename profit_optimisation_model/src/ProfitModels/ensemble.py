@@ -0,0 +1,164 @@
+"""
+-------------------------------------------------------------------------
+Runs a model configuration over an ensemble of members, e.g. sites or
+parameter draws, in parallel worker processes. The configuration is sent
+to each worker once and each task only carries the forcing and
+parameters of a single member.
+-------------------------------------------------------------------------
+"""
+
+from multiprocessing import Pool
+from numpy import asarray, broadcast_to, stack
+
+from profit_optimisation_model.src.ProfitModels.preset_models import build_model_from_parameters
+
+
+# Configuration of the worker process, set once by _initialise_worker
+_worker_configuration = None
+
+
+def run_ensemble(time_steps,
+                 soil_water_potential_values,
+                 air_temperature_values,
+                 air_vapour_pressure_deficit_values,
+                 air_pressure_values,
+                 atmospheric_CO2_concentration_values,
+                 intercellular_oxygen_values,
+                 photosynthetically_active_radiation_values,
+                 member_parameters = None,
+                 model_builder = build_model_from_parameters,
+                 number_of_processes = None,
+                 number_of_leaf_water_potential_sample_points = 1000,
+                 leaf_water_potential_tolerance = None,
+                 warm_start = False,
+                 number_of_window_sample_points = 50):
+
+    """
+    Runs the model built for each member over the member's forcing. The forcing values are either a 1d array over
+    time, shared by all members, or a 2d array of members x time.
+
+    @param time_steps: (s)
+    @param soil_water_potential_values: MPa
+    @param air_temperature_values: K
+    @param air_vapour_pressure_deficit_values: kPa
+    @param air_pressure_values: kPa
+    @param atmospheric_CO2_concentration_values: umol mol-1
+    @param intercellular_oxygen_values: umol mol-1
+    @param photosynthetically_active_radiation_values: umol m-2 s-1
+    @param member_parameters: dict of parameter name -> 1d array with a value for each member, e.g.
+                              {'maximum_conductance': [...], 'P50': [...], 'P88': [...]}. The model of each member is
+                              model_builder(**parameters of the member). If None every member uses model_builder().
+    @param model_builder: function returning a profit optimisation model. Must be picklable, i.e. defined at the top
+                          level of a module.
+    @param number_of_processes: number of worker processes, None for the number of cpus. If 1 the members are run
+                                in this process.
+    @param number_of_leaf_water_potential_sample_points: see ProfitOptimisationModel.run_model
+    @param leaf_water_potential_tolerance: see ProfitOptimisationModel.run_model
+    @param warm_start: see ProfitOptimisationModel.run_model
+    @param number_of_window_sample_points: see ProfitOptimisationModel.run_model
+
+    @return: optimal leaf water potentials: MPa, members x time
+    @return: net CO2 uptake values: umol m-2 s-1, members x time
+    @return: transpiration rates: mmol m-2 s-1, members x time
+    @return: intercellular CO2 values: umol mol-1, members x time
+    @return: stomatal conductance to CO2 values: mol m-2 s-1, members x time
+    """
+
+    forcing_values = {'soil_water_potential_values': soil_water_potential_values,
+                      'air_temperature_values': air_temperature_values,
+                      'air_vapour_pressure_deficit_values': air_vapour_pressure_deficit_values,
+                      'air_pressure_values': air_pressure_values,
+                      'atmospheric_CO2_concentration_values': atmospheric_CO2_concentration_values,
+                      'intercellular_oxygen_values': intercellular_oxygen_values,
+                      'photosynthetically_active_radiation_values': photosynthetically_active_radiation_values}
+    forcing_values = {name: asarray(values, dtype=float) for name, values in forcing_values.items()}
+
+    if(member_parameters is None):
+        member_parameters = {}
+    member_parameters = {name: asarray(values) for name, values in member_parameters.items()}
+
+    number_of_members = _number_of_members(forcing_values, member_parameters, len(time_steps))
+
+    forcing_values = [broadcast_to(values, (number_of_members, len(time_steps))) for values in forcing_values.values()]
+
+    configuration = (model_builder,
+                     asarray(time_steps),
+                     (number_of_leaf_water_potential_sample_points,
+                      leaf_water_potential_tolerance,
+                      warm_start,
+                      number_of_window_sample_points))
+
+    members = [([values[i] for values in forcing_values],
+                {name: values[i] for name, values in member_parameters.items()})
+               for i in range(number_of_members)]
+
+    if(number_of_processes == 1):
+        _initialise_worker(configuration)
+        member_outputs = [_run_member(member) for member in members]
+
+    else:
+        with Pool(number_of_processes, initializer=_initialise_worker, initargs=(configuration,)) as pool:
+            member_outputs = pool.map(_run_member, members)
+
+    return tuple(stack(values) for values in zip(*member_outputs))
+
+
+def _number_of_members(forcing_values, member_parameters, number_of_time_steps):
+    """
+    Finds the number of members from the parameter table and the 2d forcing arrays and checks they all agree.
+    @param forcing_values: dict of forcing name -> 1d array over time or 2d array of members x time
+    @param member_parameters: dict of parameter name -> 1d array with a value for each member
+    @param number_of_time_steps: int
+    @return: number of members, int
+    """
+
+    for name, values in forcing_values.items():
+        if(values.ndim not in (1, 2) or values.shape[-1] != number_of_time_steps):
+            raise ValueError("{} must be a 1d array over the {} time steps or a 2d array of members x time, got "
+                             "shape {}".format(name, number_of_time_steps, values.shape))
+
+    for name, values in member_parameters.items():
+        if(values.ndim != 1):
+            raise ValueError("member parameter {} must be a 1d array with a value for each member, got shape {}"
+                             .format(name, values.shape))
+
+    # The number of members is set by the parameter table or the 2d forcing arrays
+    member_counts = ([('member parameter ' + name, len(values)) for name, values in member_parameters.items()]
+                     + [(name, len(values)) for name, values in forcing_values.items() if values.ndim == 2])
+
+    if(len(member_counts) == 0):
+        return 1
+
+    first_name, number_of_members = member_counts[0]
+
+    for name, count in member_counts[1:]:
+        if(count != number_of_members):
+            raise ValueError("{} has {} members but {} has {}".format(name, count, first_name, number_of_members))
+
+    return number_of_members
+
+
+def _initialise_worker(configuration):
+    """
+    Stores the ensemble configuration in the worker process.
+    @param configuration: (model builder, time steps, run_model settings)
+    @return: None
+    """
+
+    global _worker_configuration
+    _worker_configuration = configuration
+
+
+def _run_member(member):
+    """
+    Builds and runs the model of a single member.
+    @param member: (list of forcing values, dict of parameters)
+    @return: run_model outputs
+    """
+
+    model_builder, time_steps, settings = _worker_configuration
+    forcing_values, parameters = member
+
+    model = model_builder(**parameters)
+
+    return model.run_model(time_steps, *forcing_values, *settings)
@@ -29,6 +29,12 @@ from profit_optimisation_model.src.leaf_air_coupling_model import LeafAirCouplin
 from profit_optimisation_model.src.PhotosynthesisModels.Leuning_Model import \
     PhotosynthesisModelRubiscoLimitedLeuning, PhotosynthesisModelElectronTransportLimitedLeuning
 from profit_optimisation_model.src.PhotosynthesisModels.photosynthesis_model import PhotosynthesisModel
+from profit_optimisation_model.src.rubisco_CO2_and_O_model import RubiscoRates
+from profit_optimisation_model.src.electron_transport_rate_model import ElectronTransportRateModel
+from profit_optimisation_model.src.TemperatureDependenceModels.temperature_dependence_model import \
+    LowTemperatureAdjustedModel
+from profit_optimisation_model.src.TemperatureDependenceModels.arrhenius_and_peaked_arrhenius_function import \
+    PeakedArrheniusModel
 
 from profit_optimisation_model.src.ProfitModels.CO2GainModels.CO2_gain_profit_max_model import ProfitMaxCO2GainModel
 from profit_optimisation_model.src.ProfitModels.CO2GainModels.CO2_gain_SOX_model import SOXCO2GainModel
@@ -145,3 +151,49 @@ def build_SOX_model(conductance_model: HydraulicConductanceModel = None,
     profit_optimisation_model = SOXModel(hydraulic_cost_model, leaf_air_coupling_model, CO2_gain_model)
 
     return profit_optimisation_model
+
+
+def build_model_from_parameters(model_builder = build_profit_max_model,
+                                conductance_model_builder =
+                                cumulative_Weibull_distribution_from_conductance_loss_at_given_water_potentials,
+                                maximum_conductance: float = 0.2,
+                                P50: float = -3.,
+                                P88: float = -4.,
+                                maximum_carboxylation_rate_at_25_centigrade: float = 30.,
+                                maximum_electron_transport_rate_at_25_centigrade: float = 60.):
+
+    '''
+    Builds a preset model with the given plant parameters. The remaining parameters take the preset values. Used by
+    the ensemble runner to build a model for each member of a parameter table.
+    @param: model_builder = build_profit_max_model, either build_profit_max_model or build_SOX_model
+    @param: conductance_model_builder = cumulative_Weibull_distribution_from_conductance_loss_at_given_water_potentials,
+            function building the conductance model from the maximum conductance and the conductance loss at two
+            water potentials. The SOX preset uses SOX_conductance_model_from_conductance_loss_at_goven_water_potentials
+    @param: maximum_conductance = 0.2 (mmol m-2 s-1 MPa-1)
+    @param: P50 = -3 (MPa)
+    @param: P88 = -4 (MPa)
+    @param: maximum_carboxylation_rate_at_25_centigrade = 30 (umol m-2 s-1)
+    @param: maximum_electron_transport_rate_at_25_centigrade = 60 (umol m-2 s-1)
+    @return: profit_optimisation_model
+    '''
+
+    # conductance model
+    conductance_model = conductance_model_builder(maximum_conductance, P50, P88, 0.5, 0.88)
+
+    # photosynthesis model
+    rubisco_rates_model = RubiscoRates(
+        maximum_carboxylation_rate_model=PeakedArrheniusModel(maximum_carboxylation_rate_at_25_centigrade,
+                                                              60000.,
+                                                              200000.,
+                                                              650.))
+    electron_transport_rate_model = ElectronTransportRateModel(
+        maximum_electron_transport_rate_model=LowTemperatureAdjustedModel(
+            PeakedArrheniusModel(maximum_electron_transport_rate_at_25_centigrade, 30000., 200000., 650.)))
+
+    electron_transport_limited = PhotosynthesisModelElectronTransportLimitedLeuning(
+        electron_transport_rate_model=electron_transport_rate_model,
+        rubisco_rates_model=rubisco_rates_model)
+    rubisco_limited = PhotosynthesisModelRubiscoLimitedLeuning(rubisco_rates_model=rubisco_rates_model)
+    photosynthesis_model = PhotosynthesisModel(electron_transport_limited, rubisco_limited)
+
+    return model_builder(conductance_model=conductance_model, photosynthesis_model=photosynthesis_model)
@@ -7,8 +7,10 @@
 from profit_optimisation_model.src.ProfitModels.HydraulicCostModels.hydraulic_cost_model import HydraulicCostModel
 from profit_optimisation_model.src.leaf_air_coupling_model import LeafAirCouplingModel
 from profit_optimisation_model.src.ProfitModels.CO2GainModels.CO2_gain_model import CO2GainModelDummy
-from numpy import zeros, linspace
-from numpy import argwhere, nanargmax
+from numpy import zeros, linspace, asarray, concatenate, arange, array_split
+from numpy import where, isnan, isfinite, nan, inf, nanargmax, nanmax, argmin
+from scipy.optimize import minimize_scalar
+from multiprocessing import Pool
 
 
 class ProfitOptimisationModel:
@@ -62,28 +64,73 @@ class ProfitOptimisationModel:
                                          critical_leaf_water_potential,
                                          num=number_of_sample_points)
 
+        return self.profit_at_leaf_water_potentials(leaf_water_potentials,
+                                                    soil_water_potential,
+                                                    air_temperature,
+                                                    air_vapour_pressure_deficit,
+                                                    air_pressure,
+                                                    atmospheric_CO2_concentration,
+                                                    intercellular_oxygen,
+                                                    photosynthetically_active_radiation)
+
+    def profit_at_leaf_water_potentials(self,
+                                        leaf_water_potentials,
+                                        soil_water_potential,
+                                        air_temperature,
+                                        air_vapour_pressure_deficit,
+                                        air_pressure,
+                                        atmospheric_CO2_concentration,
+                                        intercellular_oxygen,
+                                        photosynthetically_active_radiation,
+                                        transpiration_rates=None,
+                                        maximum_net_CO2_uptake=None):
+        """
+        Calculates the profit at the given leaf water potentials.
+
+        @param leaf_water_potentials: 1d numpy array ordered away from the soil water potential, MPa
+        @param soil_water_potential: MPa
+        @param air_temperature: K
+        @param air_vapour_pressure_deficit: kPa
+        @param air_pressure: kPa
+        @param atmospheric_CO2_concentration: umol mol-1
+        @param intercellular_oxygen: umol mol-1
+        @param photosynthetically_active_radiation: umol m-2 s-1
+        @param transpiration_rates: mmol m-2 s-1. If None they are integrated from the soil water potential through the
+                                    leaf water potentials.
+        @param maximum_net_CO2_uptake: umol m-2 s-1. Net CO2 uptake used to normalise the CO2 gain. If None it is
+                                       taken from the leaf water potentials given.
+
+        @return: profit
+        @return: normalised CO2 gain
+        @return: hydraulic cost
+        @return: maximum CO2 uptake: umol m-2 s-1
+        @return: transpiration: mmol m-2 s-1
+        @return: intercellular CO2 concentration: umol mol-1
+        @return: stomatal conductance to CO2: mol m-2 s-1
+        @return: leaf_water_potentials: kPa
+        """
+
         hydraulic_costs = \
             self._hydraulic_cost_model.hydraulic_cost_as_a_function_of_leaf_water_potential(leaf_water_potentials,
                                                                                             soil_water_potential)
 
-        transpiration_as_a_function_of_leaf_water_potential = zeros(len(leaf_water_potentials))
-
-        for i in range(len(leaf_water_potentials)):
-            transpiration_as_a_function_of_leaf_water_potential[i] = \
-                self._hydraulic_cost_model.transpiration(leaf_water_potentials[i],
-                                                         soil_water_potential)
+        if(transpiration_rates is None):
+            transpiration_rates = \
+                self._hydraulic_cost_model.transpiration_as_a_function_of_leaf_water_potential(leaf_water_potentials,
+                                                                                              soil_water_potential)
 
         (CO2_gain,
          CO2_uptake,
          intercellular_CO2_as_a_function_of_leaf_water_potential,
          stomatal_conductance_to_CO2_as_a_function_of_leaf_water_potential) = \
-            self._CO2_gain_model.CO2_gain(transpiration_as_a_function_of_leaf_water_potential,
+            self._CO2_gain_model.CO2_gain(transpiration_rates,
                                           air_temperature,
                                           air_vapour_pressure_deficit,
                                           air_pressure,
                                           atmospheric_CO2_concentration,
                                           intercellular_oxygen,
-                                          photosynthetically_active_radiation)
+                                          photosynthetically_active_radiation,
+                                          maximum_net_CO2_uptake)
 
         profit = self.profit(CO2_gain, hydraulic_costs)
 
@@ -91,7 +138,7 @@ class ProfitOptimisationModel:
                 CO2_gain,
                 hydraulic_costs,
                 CO2_uptake,
-                transpiration_as_a_function_of_leaf_water_potential,
+                transpiration_rates,
                 intercellular_CO2_as_a_function_of_leaf_water_potential,
                 stomatal_conductance_to_CO2_as_a_function_of_leaf_water_potential,
                 leaf_water_potentials)
@@ -107,7 +154,10 @@ class ProfitOptimisationModel:
                       atmospheric_CO2_concentration,
                       intercellular_oxygen,
                       photosynthetically_active_radiation,
-                      number_of_sample_points=1000):
+                      number_of_sample_points=1000,
+                      leaf_water_potential_tolerance=None,
+                      initial_leaf_water_potential=None,
+                      number_of_window_sample_points=50):
         """
         Uses profit optimisation to calculate the optimal leaf water potential.
         @param soil_water_potential: MPa
@@ -118,6 +168,14 @@ class ProfitOptimisationModel:
         @param intercellular_oxygen: umol mol-1
         @param photosynthetically_active_radiation: umol m-2 s-1
         @param number_of_sample_points: Number of leaf water potentials to test
+        @param leaf_water_potential_tolerance: MPa. If None the optimum is the best of the sampled leaf water
+                                               potentials. Otherwise the sampled leaf water potentials only bracket
+                                               the optimum, which is then refined with Brent's method to this
+                                               tolerance. A few tens of sample points are enough in this case.
+        @param initial_leaf_water_potential: MPa. Guess of the optimal leaf water potential, e.g. the optimum of the
+                                             previous time step. If given only the sample points in a window around
+                                             it are tested and the window is widened until the optimum is inside it.
+        @param number_of_window_sample_points: Number of sample points in the initial window
 
         @return: optimal leaf water potential(MPa)
         @return: net CO2 uptake: umol m-2 s-1
@@ -126,32 +184,76 @@ class ProfitOptimisationModel:
         @return: stomatal conductance to CO2: mol m-2 s-1
         """
 
-        (profit,
-         CO2_gain,
-         hydraulic_costs,
-         net_CO2_uptake_as_a_function_of_leaf_water_potential,
-         transpiration_as_a_function_of_leaf_water_potential,
-         intercellular_CO2_as_a_function_of_leaf_water_potential,
-         stomatal_conductance_to_CO2_as_a_function_of_leaf_water_potential,
-         leaf_water_potentials) = \
-            self.profit_as_a_function_of_leaf_water_potential(soil_water_potential,
-                                                              air_temperature,
-                                                              air_vapour_pressure_deficit,
-                                                              air_pressure,
-                                                              atmospheric_CO2_concentration,
-                                                              intercellular_oxygen,
-                                                              photosynthetically_active_radiation,
-                                                              number_of_sample_points)
-
-        # Limit Ci/Ca to < 0.95
-        realistic_intercellular_CO2_concentration_arg = argwhere(intercellular_CO2_as_a_function_of_leaf_water_potential
-                                                                 < 0.95*atmospheric_CO2_concentration)
-        maximum_profit_id = 0
-        if(len(realistic_intercellular_CO2_concentration_arg) > 0):
-            maximum_profit_id = nanargmax(profit[realistic_intercellular_CO2_concentration_arg])
+        if(initial_leaf_water_potential is None):
+            (profit,
+             CO2_gain,
+             hydraulic_costs,
+             net_CO2_uptake_as_a_function_of_leaf_water_potential,
+             transpiration_as_a_function_of_leaf_water_potential,
+             intercellular_CO2_as_a_function_of_leaf_water_potential,
+             stomatal_conductance_to_CO2_as_a_function_of_leaf_water_potential,
+             leaf_water_potentials) = \
+                self.profit_as_a_function_of_leaf_water_potential(soil_water_potential,
+                                                                  air_temperature,
+                                                                  air_vapour_pressure_deficit,
+                                                                  air_pressure,
+                                                                  atmospheric_CO2_concentration,
+                                                                  intercellular_oxygen,
+                                                                  photosynthetically_active_radiation,
+                                                                  number_of_sample_points)
+
+            realistic_profit = self._realistic_profit(profit,
+                                                      intercellular_CO2_as_a_function_of_leaf_water_potential,
+                                                      atmospheric_CO2_concentration)
+
+            maximum_net_CO2_uptake = None
+
+        else:
+            ((profit,
+              CO2_gain,
+              hydraulic_costs,
+              net_CO2_uptake_as_a_function_of_leaf_water_potential,
+              transpiration_as_a_function_of_leaf_water_potential,
+              intercellular_CO2_as_a_function_of_leaf_water_potential,
+              stomatal_conductance_to_CO2_as_a_function_of_leaf_water_potential,
+              leaf_water_potentials),
+             realistic_profit,
+             maximum_net_CO2_uptake) = \
+                self._profit_in_window(initial_leaf_water_potential,
+                                       number_of_window_sample_points,
+                                       soil_water_potential,
+                                       air_temperature,
+                                       air_vapour_pressure_deficit,
+                                       air_pressure,
+                                       atmospheric_CO2_concentration,
+                                       intercellular_oxygen,
+                                       photosynthetically_active_radiation,
+                                       number_of_sample_points)
 
-
-        maximum_profit_id_old = nanargmax(profit)
+        maximum_profit_id = 0
+        if(any(~isnan(realistic_profit))):
+            maximum_profit_id = nanargmax(realistic_profit)
+
+        elif(leaf_water_potential_tolerance is not None):
+            # Nothing to refine if no sampled leaf water potential is realistic
+            leaf_water_potential_tolerance = None
+
+        if(leaf_water_potential_tolerance is not None):
+            if(maximum_net_CO2_uptake is None):
+                maximum_net_CO2_uptake = nanmax(net_CO2_uptake_as_a_function_of_leaf_water_potential)
+
+            return self._refine_optimal_state(realistic_profit,
+                                              maximum_net_CO2_uptake,
+                                              leaf_water_potentials,
+                                              maximum_profit_id,
+                                              leaf_water_potential_tolerance,
+                                              soil_water_potential,
+                                              air_temperature,
+                                              air_vapour_pressure_deficit,
+                                              air_pressure,
+                                              atmospheric_CO2_concentration,
+                                              intercellular_oxygen,
+                                              photosynthetically_active_radiation)
 
         optimal_leaf_water_potential = leaf_water_potentials[maximum_profit_id]
         net_CO2_uptake = net_CO2_uptake_as_a_function_of_leaf_water_potential[maximum_profit_id]
@@ -166,6 +268,295 @@ class ProfitOptimisationModel:
                 intercellular_CO2,
                 stomatal_conductance_to_CO2)
 
+    def _realistic_profit(self, profit, intercellular_CO2, atmospheric_CO2_concentration):
+        """
+        Limits Ci/Ca to < 0.95
+        @param profit: profit at the sampled leaf water potentials
+        @param intercellular_CO2: umol mol-1
+        @param atmospheric_CO2_concentration: umol mol-1
+        @return: profit, nan where Ci/Ca >= 0.95
+        """
+
+        return where(intercellular_CO2 < 0.95*atmospheric_CO2_concentration, profit, nan)
+
+    def _profit_in_window(self,
+                          initial_leaf_water_potential,
+                          number_of_window_sample_points,
+                          soil_water_potential,
+                          air_temperature,
+                          air_vapour_pressure_deficit,
+                          air_pressure,
+                          atmospheric_CO2_concentration,
+                          intercellular_oxygen,
+                          photosynthetically_active_radiation,
+                          number_of_sample_points):
+        """
+        Calculates the profit for the sample points of profit_as_a_function_of_leaf_water_potential in a window
+        around the initial leaf water potential. While the best sample point is on the window edge the window is
+        extended past that edge, by more each time. For a single peaked profit curve the best sample point
+        is then the same as for the full set of sample points.
+
+        This is a separate code path from the full set of sample points used without a warm start. The CO2 gain is
+        normalised by the net CO2 uptake at the critical leaf water potential instead of the maximum over all the
+        sample points, which is the same while net CO2 uptake increases with transpiration. If the net CO2 uptake
+        at the critical leaf water potential is not finite all the sample points are calculated and normalised by
+        their maximum, as without a warm start.
+
+        @param initial_leaf_water_potential: MPa
+        @param number_of_window_sample_points: Number of sample points in the initial window
+        @param soil_water_potential: MPa
+        @param air_temperature: K
+        @param air_vapour_pressure_deficit: kPa
+        @param air_pressure: kPa
+        @param atmospheric_CO2_concentration: umol mol-1
+        @param intercellular_oxygen: umol mol-1
+        @param photosynthetically_active_radiation: umol m-2 s-1
+        @param number_of_sample_points: Number of sample points between the soil and critical water potentials
+
+        @return: tuple of profit_at_leaf_water_potentials outputs for the window
+        @return: profit in the window, nan where Ci/Ca >= 0.95
+        @return: net CO2 uptake used to normalise the CO2 gain: umol m-2 s-1
+        """
+
+        critical_leaf_water_potential = self._hydraulic_cost_model.critical_leaf_water_potential
+
+        leaf_water_potentials = linspace(soil_water_potential,
+                                         critical_leaf_water_potential,
+                                         num=number_of_sample_points)
+
+        # The transpiration integral is cheap, it is the CO2 gain that is avoided outside the window
+        transpiration_rates = \
+            self._hydraulic_cost_model.transpiration_as_a_function_of_leaf_water_potential(leaf_water_potentials,
+                                                                                          soil_water_potential)
+
+        # Net CO2 uptake increases with transpiration so its maximum over all sample points is at the critical leaf
+        # water potential.
+        maximum_net_CO2_uptake = \
+            self.profit_at_leaf_water_potentials(leaf_water_potentials[-1:],
+                                                 soil_water_potential,
+                                                 air_temperature,
+                                                 air_vapour_pressure_deficit,
+                                                 air_pressure,
+                                                 atmospheric_CO2_concentration,
+                                                 intercellular_oxygen,
+                                                 photosynthetically_active_radiation,
+                                                 transpiration_rates[-1:])[3][0]
+
+        if(not isfinite(maximum_net_CO2_uptake)):
+            state = self.profit_at_leaf_water_potentials(leaf_water_potentials,
+                                                         soil_water_potential,
+                                                         air_temperature,
+                                                         air_vapour_pressure_deficit,
+                                                         air_pressure,
+                                                         atmospheric_CO2_concentration,
+                                                         intercellular_oxygen,
+                                                         photosynthetically_active_radiation,
+                                                         transpiration_rates)
+
+            realistic_profit = self._realistic_profit(state[0], state[5], atmospheric_CO2_concentration)
+
+            return state, realistic_profit, nanmax(state[3])
+
+        def state_at_sample_points(lower_id, upper_id):
+            return self.profit_at_leaf_water_potentials(leaf_water_potentials[lower_id:upper_id],
+                                                        soil_water_potential,
+                                                        air_temperature,
+                                                        air_vapour_pressure_deficit,
+                                                        air_pressure,
+                                                        atmospheric_CO2_concentration,
+                                                        intercellular_oxygen,
+                                                        photosynthetically_active_radiation,
+                                                        transpiration_rates[lower_id:upper_id],
+                                                        maximum_net_CO2_uptake)
+
+        centre_id = argmin(abs(leaf_water_potentials - initial_leaf_water_potential))
+        half_width = max(number_of_window_sample_points // 2, 1)
+
+        lower_id = max(centre_id - half_width, 0)
+        upper_id = min(centre_id + half_width + 1, number_of_sample_points)
+        state = state_at_sample_points(lower_id, upper_id)
+
+        while(True):
+            realistic_profit = self._realistic_profit(state[0], state[5], atmospheric_CO2_concentration)
+
+            new_lower_id = lower_id
+            new_upper_id = upper_id
+
+            if(all(isnan(realistic_profit))):
+                # Nothing to follow so test the remaining sample points
+                new_lower_id = 0
+                new_upper_id = number_of_sample_points
+
+            else:
+                maximum_profit_id = nanargmax(realistic_profit)
+
+                if(maximum_profit_id == 0):
+                    new_lower_id = max(lower_id - half_width, 0)
+
+                if(maximum_profit_id == upper_id - lower_id - 1):
+                    new_upper_id = min(upper_id + half_width, number_of_sample_points)
+
+            if(new_lower_id == lower_id and new_upper_id == upper_id):
+                return state, realistic_profit, maximum_net_CO2_uptake
+
+            # Only the new sample points are evaluated
+            states = [state]
+            if(new_lower_id < lower_id):
+                states.insert(0, state_at_sample_points(new_lower_id, lower_id))
+            if(new_upper_id > upper_id):
+                states.append(state_at_sample_points(upper_id, new_upper_id))
+
+            state = tuple(concatenate(values) for values in zip(*states))
+
+            lower_id = new_lower_id
+            upper_id = new_upper_id
+            half_width *= 2
+
+    def _refine_optimal_state(self,
+                              realistic_profit,
+                              maximum_net_CO2_uptake,
+                              leaf_water_potentials,
+                              maximum_profit_id,
+                              leaf_water_potential_tolerance,
+                              soil_water_potential,
+                              air_temperature,
+                              air_vapour_pressure_deficit,
+                              air_pressure,
+                              atmospheric_CO2_concentration,
+                              intercellular_oxygen,
+                              photosynthetically_active_radiation,
+                              number_of_integration_steps=1000):
+        """
+        Refines the best sampled leaf water potential with Brent's method. The optimum is bracketed by the sampled
+        leaf water potentials either side of the best one. The transpiration at each leaf water potential tried comes
+        from the transpiration method of the hydraulic conductance model, which is exact for the Weibull and SOX
+        models, so it does not depend on the number of sampled leaf water potentials.
+
+        @param realistic_profit: profit at the sampled leaf water potentials, nan where Ci/Ca >= 0.95
+        @param maximum_net_CO2_uptake: net CO2 uptake used to normalise the CO2 gain, umol m-2 s-1
+        @param leaf_water_potentials: sampled leaf water potentials, MPa
+        @param maximum_profit_id: index of the best sampled leaf water potential
+        @param leaf_water_potential_tolerance: MPa
+        @param soil_water_potential: MPa
+        @param air_temperature: K
+        @param air_vapour_pressure_deficit: kPa
+        @param air_pressure: kPa
+        @param atmospheric_CO2_concentration: umol mol-1
+        @param intercellular_oxygen: umol mol-1
+        @param photosynthetically_active_radiation: umol m-2 s-1
+        @param number_of_integration_steps: Number of trapezium steps used to integrate the transpiration for
+                                            conductance models without an exact integral
+
+        @return: optimal leaf water potential(MPa)
+        @return: net CO2 uptake: umol m-2 s-1
+        @return: transpiration: mmol m-2 s-1
+        @return: intercellular CO2 concentration: umol mol-1
+        @return: stomatal conductance to CO2: mol m-2 s-1
+        """
+
+        def state_at_leaf_water_potential(leaf_water_potential):
+            transpiration_rate = asarray([self._hydraulic_cost_model.transpiration(leaf_water_potential,
+                                                                                   soil_water_potential,
+                                                                                   number_of_integration_steps)])
+
+            return self.profit_at_leaf_water_potentials(asarray([leaf_water_potential]),
+                                                        soil_water_potential,
+                                                        air_temperature,
+                                                        air_vapour_pressure_deficit,
+                                                        air_pressure,
+                                                        atmospheric_CO2_concentration,
+                                                        intercellular_oxygen,
+                                                        photosynthetically_active_radiation,
+                                                        transpiration_rate,
+                                                        maximum_net_CO2_uptake)
+
+        def negative_realistic_profit(leaf_water_potential):
+            state = state_at_leaf_water_potential(leaf_water_potential)
+
+            # Limit Ci/Ca to < 0.95
+            if(not state[5][0] < 0.95*atmospheric_CO2_concentration or isnan(state[0][0])):
+                return inf
+
+            return -state[0][0]
+
+        # Bracket the optimum with the neighbouring sample points
+        upper_id = max(maximum_profit_id - 1, 0)
+        lower_id = min(maximum_profit_id + 1, len(leaf_water_potentials) - 1)
+
+        result = minimize_scalar(negative_realistic_profit,
+                                 bounds=(leaf_water_potentials[lower_id], leaf_water_potentials[upper_id]),
+                                 method='bounded',
+                                 options={'xatol': leaf_water_potential_tolerance})
+
+        optimal_leaf_water_potential = leaf_water_potentials[maximum_profit_id]
+        if(result.fun < -realistic_profit[maximum_profit_id]):
+            optimal_leaf_water_potential = result.x
+
+        (profit,
+         CO2_gain,
+         hydraulic_cost,
+         net_CO2_uptake,
+         transpiration_rate,
+         intercellular_CO2,
+         stomatal_conductance_to_CO2,
+         leaf_water_potential) = state_at_leaf_water_potential(optimal_leaf_water_potential)
+
+        return (optimal_leaf_water_potential,
+                net_CO2_uptake[0],
+                transpiration_rate[0],
+                intercellular_CO2[0],
+                stomatal_conductance_to_CO2[0])
+
+    def closed_stomata_state(self,
+                             soil_water_potential,
+                             air_temperature,
+                             air_vapour_pressure_deficit,
+                             air_pressure,
+                             atmospheric_CO2_concentration,
+                             intercellular_oxygen,
+                             photosynthetically_active_radiation):
+        """
+        State with the stomata closed, i.e. the leaf water potential equal to the soil water potential. For CO2 gain
+        models that are closed_without_light, Ci >= Ca at every leaf water potential without light so none pass the
+        Ci/Ca < 0.95 limit and this is the state optimal_state returns.
+        @param soil_water_potential: MPa
+        @param air_temperature: K
+        @param air_vapour_pressure_deficit: kPa
+        @param air_pressure: kPa
+        @param atmospheric_CO2_concentration: umol mol-1
+        @param intercellular_oxygen: umol mol-1
+        @param photosynthetically_active_radiation: umol m-2 s-1
+
+        @return: leaf water potential(MPa)
+        @return: net CO2 uptake: umol m-2 s-1
+        @return: transpiration: mmol m-2 s-1
+        @return: intercellular CO2 concentration: umol mol-1
+        @return: stomatal conductance to CO2: mol m-2 s-1
+        """
+
+        (profit,
+         CO2_gain,
+         hydraulic_cost,
+         net_CO2_uptake,
+         transpiration_rate,
+         intercellular_CO2,
+         stomatal_conductance_to_CO2,
+         leaf_water_potential) = \
+            self.profit_at_leaf_water_potentials(asarray([soil_water_potential]),
+                                                 soil_water_potential,
+                                                 air_temperature,
+                                                 air_vapour_pressure_deficit,
+                                                 air_pressure,
+                                                 atmospheric_CO2_concentration,
+                                                 intercellular_oxygen,
+                                                 photosynthetically_active_radiation)
+
+        return (leaf_water_potential[0],
+                net_CO2_uptake[0],
+                transpiration_rate[0],
+                intercellular_CO2[0],
+                stomatal_conductance_to_CO2[0])
+
     def calculate_time_step(self,
                             step_size,
                             soil_water_potential,
@@ -175,9 +566,13 @@ class ProfitOptimisationModel:
                             atmospheric_CO2_concentration,
                             intercellular_oxygen,
                             photosynthetically_active_radiation,
-                            number_of_sample_points=1000):
+                            number_of_sample_points=1000,
+                            leaf_water_potential_tolerance=None,
+                            initial_leaf_water_potential=None,
+                            number_of_window_sample_points=50):
         """
-        Method to calculate plant properties for a single time step.
+        Method to calculate plant properties for a single time step. When there is no light and the CO2 gain model
+        guarantees the stomata are closed without light (see closed_without_light) the profit curve is not sampled.
 
         @param step_size: s, float
         @param soil_water_potential: MPa, float
@@ -188,6 +583,9 @@ class ProfitOptimisationModel:
         @param intercellular_oxygen: umol mol-1, float
         @param photosynthetically_active_radiation: umol m-2 s-1 float
         @param number_of_sample_points: int
+        @param leaf_water_potential_tolerance: MPa, float or None
+        @param initial_leaf_water_potential: MPa, float or None
+        @param number_of_window_sample_points: int
 
         @return: leaf_water_potential: MPa, float
         @return: net_CO2_uptake: umol m-2 s-1, float
@@ -196,14 +594,27 @@ class ProfitOptimisationModel:
         @return: stomatal_conductance_to_CO2: mol m-2 s-1 float
         """
 
-        output = self.optimal_state(soil_water_potential,
-                                    air_temperature,
-                                    air_vapour_pressure_deficit,
-                                    air_pressure,
-                                    atmospheric_CO2_concentration,
-                                    intercellular_oxygen,
-                                    photosynthetically_active_radiation,
-                                    number_of_sample_points)
+        if(photosynthetically_active_radiation == 0. and self._CO2_gain_model.closed_without_light):
+            output = self.closed_stomata_state(soil_water_potential,
+                                               air_temperature,
+                                               air_vapour_pressure_deficit,
+                                               air_pressure,
+                                               atmospheric_CO2_concentration,
+                                               intercellular_oxygen,
+                                               photosynthetically_active_radiation)
+
+        else:
+            output = self.optimal_state(soil_water_potential,
+                                        air_temperature,
+                                        air_vapour_pressure_deficit,
+                                        air_pressure,
+                                        atmospheric_CO2_concentration,
+                                        intercellular_oxygen,
+                                        photosynthetically_active_radiation,
+                                        number_of_sample_points,
+                                        leaf_water_potential_tolerance,
+                                        initial_leaf_water_potential,
+                                        number_of_window_sample_points)
 
         self._hydraulic_cost_model.update_xylem_damage(output[0], step_size, output[2], soil_water_potential)
 
@@ -218,7 +629,13 @@ class ProfitOptimisationModel:
                   atmospheric_CO2_concentration_values,
                   intercellular_oxygen_values,
                   photosynthetically_active_radiation_values,
-                  number_of_leaf_water_potential_sample_points=1000):
+                  number_of_leaf_water_potential_sample_points=1000,
+                  leaf_water_potential_tolerance=None,
+                  warm_start=False,
+                  number_of_window_sample_points=50,
+                  number_of_processes=1,
+                  precompute_rate_parameters=True,
+                  rate_parameter_values=None):
 
         """
         Method used to run the model on a set of time series data.
@@ -231,23 +648,104 @@ class ProfitOptimisationModel:
         @param intercellular_oxygen_values: umol mol-1
         @param photosynthetically_active_radiation_values: umol m-2 s-1
         @param number_of_leaf_water_potential_sample_points:
+        @param leaf_water_potential_tolerance: MPa, None for a grid search over the sample points
+        @param warm_start: if True each time step searches first in a window around the previous optimal leaf water
+                           potential. Off by default as for the vectorised models the full set of sample points is
+                           about as fast, the window only pays off for expensive CO2 gain models or many sample
+                           points.
+        @param number_of_window_sample_points: number of sample points in the initial warm start window
+        @param number_of_processes: number of processes to split the time steps between. Only used if the model is
+                                    not dynamic (see is_dynamic), otherwise the time steps are run in order in this
+                                    process. The model must be picklable and the calling script guarded by
+                                    if __name__ == '__main__' on platforms that spawn processes.
+        @param precompute_rate_parameters: if True the photosynthesis rate parameters, which only depend on the
+                                           forcing, are calculated for all the time steps in one vectorised pass
+                                           before the time steps are run. Photosynthesis models that do not implement
+                                           _calculate_rate_parameters calculate them in each time step as before.
+        @param rate_parameter_values: photosynthesis rate parameter arrays for this forcing, as returned by
+                                      precompute_rate_parameters of the CO2 gain model, e.g. loaded from a per site
+                                      cache. If given they are used instead of calculating the rate parameters.
 
         @return: optimal leaf water potentials: MPa
         @return: net CO2 uptake values: umol m-2 s-1
         @return: transpiration rates: mmol m-2 s-1
         """
 
-        # Setup output arrays
-        optimal_leaf_water_potentials = zeros(len(time_steps))
-        net_CO2_uptake_values = zeros(len(time_steps))
-        transpiration_rate_values = zeros(len(time_steps))
-        intercellular_CO2_values = zeros(len(time_steps))
-        stomatal_conductance_to_CO2_values = zeros(len(time_steps))
-
         # Calculate time step size
         step_size = time_steps[1] - time_steps[0]
 
-        for i in range(len(time_steps)):
+        forcing_values = (soil_water_potential_values,
+                          air_temperature_values,
+                          air_vapour_pressure_deficit_values,
+                          air_pressure_values,
+                          atmospheric_CO2_concentration_values,
+                          intercellular_oxygen_values,
+                          photosynthetically_active_radiation_values)
+
+        settings = (number_of_leaf_water_potential_sample_points,
+                    leaf_water_potential_tolerance,
+                    warm_start,
+                    number_of_window_sample_points,
+                    precompute_rate_parameters)
+
+        if(number_of_processes > 1 and not self.is_dynamic):
+            # Time steps are independent so each process runs a consecutive chunk of them
+            chunks = array_split(arange(len(time_steps)), number_of_processes)
+
+            with Pool(number_of_processes) as pool:
+                chunk_outputs = pool.starmap(self._run_time_steps,
+                                             [(step_size,
+                                               *(asarray(values)[chunk] for values in forcing_values),
+                                               *settings,
+                                               _select_time_steps(rate_parameter_values, chunk))
+                                              for chunk in chunks])
+
+            return tuple(concatenate(values) for values in zip(*chunk_outputs))
+
+        return self._run_time_steps(step_size, *forcing_values, *settings, rate_parameter_values)
+
+    def _run_time_steps(self,
+                        step_size,
+                        soil_water_potential_values,
+                        air_temperature_values,
+                        air_vapour_pressure_deficit_values,
+                        air_pressure_values,
+                        atmospheric_CO2_concentration_values,
+                        intercellular_oxygen_values,
+                        photosynthetically_active_radiation_values,
+                        number_of_leaf_water_potential_sample_points,
+                        leaf_water_potential_tolerance,
+                        warm_start,
+                        number_of_window_sample_points,
+                        precompute_rate_parameters=False,
+                        rate_parameter_values=None):
+        """
+        Runs the time steps in order. See run_model for the parameters and returns.
+        """
+
+        number_of_time_steps = len(soil_water_potential_values)
+
+        if(rate_parameter_values is not None):
+            self._CO2_gain_model.set_precomputed_rate_parameters(air_temperature_values,
+                                                                 intercellular_oxygen_values,
+                                                                 photosynthetically_active_radiation_values,
+                                                                 rate_parameter_values)
+
+        elif(precompute_rate_parameters):
+            self._CO2_gain_model.precompute_rate_parameters(air_temperature_values,
+                                                            intercellular_oxygen_values,
+                                                            photosynthetically_active_radiation_values)
+
+        # Setup output arrays
+        optimal_leaf_water_potentials = zeros(number_of_time_steps)
+        net_CO2_uptake_values = zeros(number_of_time_steps)
+        transpiration_rate_values = zeros(number_of_time_steps)
+        intercellular_CO2_values = zeros(number_of_time_steps)
+        stomatal_conductance_to_CO2_values = zeros(number_of_time_steps)
+
+        initial_leaf_water_potential = None
+
+        for i in range(number_of_time_steps):
             (optimal_leaf_water_potentials[i],
              net_CO2_uptake_values[i],
              transpiration_rate_values[i],
@@ -261,7 +759,17 @@ class ProfitOptimisationModel:
                                          atmospheric_CO2_concentration_values[i],
                                          intercellular_oxygen_values[i],
                                          photosynthetically_active_radiation_values[i],
-                                         number_of_leaf_water_potential_sample_points)
+                                         number_of_leaf_water_potential_sample_points,
+                                         leaf_water_potential_tolerance,
+                                         initial_leaf_water_potential,
+                                         number_of_window_sample_points)
+
+            if(warm_start):
+                initial_leaf_water_potential = optimal_leaf_water_potentials[i]
+
+        if(precompute_rate_parameters or rate_parameter_values is not None):
+            # The precomputed parameters are only valid for this forcing
+            self._CO2_gain_model.clear_rate_parameters()
 
         return (optimal_leaf_water_potentials,
                 net_CO2_uptake_values,
@@ -269,6 +777,13 @@ class ProfitOptimisationModel:
                 intercellular_CO2_values,
                 stomatal_conductance_to_CO2_values)
 
+    @property
+    def is_dynamic(self):
+        """
+        @return: bool, False if the model state never changes between time steps
+        """
+        return self._hydraulic_cost_model.hydraulic_conductance_model.is_dynamic
+
     @property
     def hydraulic_cost_model(self):
         return self._hydraulic_cost_model
@@ -280,3 +795,20 @@ class ProfitOptimisationModel:
     @property
     def CO2_gain_model(self):
         return self._CO2_gain_model
+
+
+def _select_time_steps(rate_parameter_values, time_step_ids):
+    """
+    Selects the given time steps from rate parameter arrays, which may be nested in tuples.
+    @param rate_parameter_values: tuple of arrays with a value for each time step, or None
+    @param time_step_ids: array of time step indices
+    @return: rate parameter values for the selected time steps
+    """
+
+    if(rate_parameter_values is None):
+        return None
+
+    if(isinstance(rate_parameter_values, tuple)):
+        return tuple(_select_time_steps(values, time_step_ids) for values in rate_parameter_values)
+
+    return asarray(rate_parameter_values)[time_step_ids]
@@ -5,7 +5,7 @@ Implementation of the Q10 temperature dependence model
 """
 
 from profit_optimisation_model.src.TemperatureDependenceModels.temperature_dependence_model \
-    import TemperatureDependenceModel
+    import TemperatureDependenceModel, as_temperature_array
 from profit_optimisation_model.src.conversions import TWENTY_FIVE_DEGREES_CENTIGRADE_IN_KELVIN
 from numpy import power
 
@@ -23,5 +23,5 @@ class Q10TemperatureDependenceModel(TemperatureDependenceModel):
         self._Q10_ratio = Q10_parameter
 
     def get_value_at_temperature(self, temperature):
-        power_component = (temperature - TWENTY_FIVE_DEGREES_CENTIGRADE_IN_KELVIN) / 10
+        power_component = (as_temperature_array(temperature) - TWENTY_FIVE_DEGREES_CENTIGRADE_IN_KELVIN) / 10
         return self._value_at_25C * power(self._Q10_ratio, power_component)
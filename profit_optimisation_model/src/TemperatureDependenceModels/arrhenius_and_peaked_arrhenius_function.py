@@ -6,7 +6,7 @@ from numpy import exp
 from profit_optimisation_model.src.constants import MOLAR_GAS_CONSTANT
 from profit_optimisation_model.src.conversions import TWENTY_FIVE_DEGREES_CENTIGRADE_IN_KELVIN
 from profit_optimisation_model.src.TemperatureDependenceModels.temperature_dependence_model \
-    import TemperatureDependenceModel
+    import TemperatureDependenceModel, as_temperature_array
 
 
 class ArrheniusModel(TemperatureDependenceModel):
@@ -19,7 +19,9 @@ class ArrheniusModel(TemperatureDependenceModel):
         self._activation_energy = activation_energy
 
     def get_value_at_temperature(self, temperature):
-        return arrhenius_function(temperature, self._rate_at_25_centigrade, self._activation_energy)
+        return arrhenius_function(as_temperature_array(temperature),
+                                  self._rate_at_25_centigrade,
+                                  self._activation_energy)
 
 
 
@@ -34,8 +36,8 @@ class PeakedArrheniusModel(ArrheniusModel):
         self._entropy_term = entropy_term
 
     def get_value_at_temperature(self, temperature):
-        return peaked_arrhenius_function(temperature, self._rate_at_25_centigrade, self._activation_energy,
-                                         self._deactivation_energy, self._entropy_term)
+        return peaked_arrhenius_function(as_temperature_array(temperature), self._rate_at_25_centigrade,
+                                         self._activation_energy, self._deactivation_energy, self._entropy_term)
 
 
 def arrhenius_function(temperature_kelvin, rate_at_25_centigrade, activation_energy):
@@ -0,0 +1,126 @@
+"""
+------------------------------------------------------------------------
+Lookup table for a temperature dependent model. The model is evaluated
+once on a regular temperature grid and values are linearly interpolated
+from the table. Temperatures outside the table are passed to the model.
+------------------------------------------------------------------------
+"""
+
+from profit_optimisation_model.src.TemperatureDependenceModels.temperature_dependence_model \
+    import TemperatureDependenceModel
+
+from numpy import arange, asarray, where, errstate, abs, nanmax, floor, clip, nan_to_num, ndim
+
+
+class TabulatedTemperatureDependenceModel(TemperatureDependenceModel):
+    _base_temperature_dependent_model: TemperatureDependenceModel
+    _minimum_temperature: float
+    _temperature_step: float
+    _temperatures: object
+    _values: object
+    _maximum_relative_error: float
+
+    def __init__(self,
+                 base_temperature_dependent_model: TemperatureDependenceModel,
+                 minimum_temperature: float = 250.,
+                 maximum_temperature: float = 330.,
+                 temperature_step: float = 0.01):
+        """
+        The base model is evaluated on the table once when the model is created. The largest relative error of the
+        interpolation, found half way between the table temperatures, is given by maximum_relative_error. For the
+        Arrhenius and Q10 models with the default table it is below 1e-6. Temperatures on the table, e.g. forcing
+        quantised to the table step, are exact to rounding.
+        @param base_temperature_dependent_model: temperature dependent model to tabulate
+        @param minimum_temperature: (K)
+        @param maximum_temperature: (K)
+        @param temperature_step: (K) spacing of the table temperatures
+        """
+
+        super().__init__(base_temperature_dependent_model.get_value_at_25C)
+        self._base_temperature_dependent_model = base_temperature_dependent_model
+        self._minimum_temperature = minimum_temperature
+        self._temperature_step = temperature_step
+
+        number_of_steps = int(round((maximum_temperature - minimum_temperature) / temperature_step))
+        self._temperatures = minimum_temperature + temperature_step * arange(number_of_steps + 1)
+        self._values = asarray(base_temperature_dependent_model.get_value_at_temperature(self._temperatures),
+                               dtype=float)
+
+        # Compare the interpolated values with the base model half way between the table temperatures
+        midpoint_temperatures = self._temperatures[:-1] + temperature_step / 2
+        midpoint_values = asarray(base_temperature_dependent_model.get_value_at_temperature(midpoint_temperatures),
+                                  dtype=float)
+
+        with errstate(divide='ignore', invalid='ignore'):
+            relative_errors = abs(self._interpolate(midpoint_temperatures) / midpoint_values - 1)
+
+        self._maximum_relative_error = nanmax(where(midpoint_values != 0., relative_errors, 0.))
+
+    def get_value_at_temperature(self, temperature):
+        """
+        @param temperature: (K), float or array like
+        @return: value at the temperature, float or numpy array with the shape of temperature
+        """
+
+        if(ndim(temperature) == 0):
+            return self._get_value_at_single_temperature(temperature)
+
+        temperature_array = asarray(temperature, dtype=float)
+
+        values = self._interpolate(temperature_array)
+
+        outside_table = (temperature_array < self._temperatures[0]) | (temperature_array > self._temperatures[-1])
+
+        if(outside_table.any()):
+            values = where(outside_table,
+                           self._base_temperature_dependent_model.get_value_at_temperature(temperature_array),
+                           values)
+
+        return values[()]
+
+    def _get_value_at_single_temperature(self, temperature):
+        """
+        @param temperature: (K), float
+        @return: value at the temperature, float
+        """
+
+        position = (temperature - self._minimum_temperature) / self._temperature_step
+
+        # Temperatures outside the table, or nan, are passed to the base model
+        if(not 0. <= position <= len(self._values) - 1):
+            return self._base_temperature_dependent_model.get_value_at_temperature(temperature)
+
+        interval = min(int(position), len(self._values) - 2)
+        weight = position - interval
+
+        return self._values[interval] * (1 - weight) + self._values[interval + 1] * weight
+
+    def _interpolate(self, temperature):
+        """
+        Linear interpolation on the regular table. The table interval is found directly from the temperature, so no
+        search is needed. Temperatures outside the table are extrapolated from the end intervals.
+        @param temperature: (K), numpy array
+        @return: interpolated values, numpy array
+        """
+
+        position = (temperature - self._minimum_temperature) / self._temperature_step
+
+        # Nan temperatures are given the first interval and stay nan through the weight
+        interval = clip(nan_to_num(floor(position)), 0, len(self._values) - 2).astype(int)
+
+        weight = position - interval
+
+        return self._values[interval] * (1 - weight) + self._values[interval + 1] * weight
+
+    def get_base_temperature_dependent_model(self):
+        """
+        @return: (TemperatureDependenceModel)
+        """
+        return self._base_temperature_dependent_model
+
+    @property
+    def maximum_relative_error(self):
+        """
+        @return: (unitless) largest relative error of the interpolation within the table
+        """
+        return self._maximum_relative_error
@@ -7,7 +7,7 @@ Base class for temperature dependent models
 
 from profit_optimisation_model.src.conversions import degrees_centigrade_to_kelvin
 
-from numpy import full, ndarray, zeros, float64
+from numpy import full, shape, ndim, asarray, where
 
 
 class TemperatureDependenceModel:
@@ -17,9 +17,13 @@ class TemperatureDependenceModel:
         self._value_at_25C = value_at_25C
 
     def get_value_at_temperature(self, temperature):
+        """
+        @param temperature: (K), float or array like, e.g. a list, numpy array or pandas series
+        @return: value at the temperature, float or numpy array with the shape of temperature
+        """
 
-        if(type(temperature) is ndarray):
-            return full(temperature.shape(), self._value_at_25C)
+        if(ndim(temperature) > 0):
+            return full(shape(temperature), self._value_at_25C)
 
         return self._value_at_25C
 
@@ -47,19 +51,25 @@ class LowTemperatureAdjustedModel(TemperatureDependenceModel):
         self._upper_bound = degrees_centigrade_to_kelvin(upper_bound_C)
 
     def get_value_at_temperature(self, temperature):
+        """
+        @param temperature: (K), float or array like, e.g. a list, numpy array or pandas series
+        @return: value at the temperature, float or numpy array with the shape of temperature
+        """
 
-        if (type(temperature) is float or type(temperature) is float64):
+        if(ndim(temperature) == 0):
             return self._get_value_at_single_temperature(temperature)
 
-        elif (type(temperature) is ndarray):
-            values = zeros(len(temperature))
-
-            for i in range(len(temperature)):
-                values[i] = self._get_value_at_single_temperature(temperature[i])
+        temperature = asarray(temperature, dtype=float)
 
-            return values
+        # get the unmodified values from the base temperature model
+        base_value = self._base_temperature_dependent_model.get_value_at_temperature(temperature)
 
-        return None
+        # zero below the lower bound, unchanged above the upper bound and scaled between the bounds
+        return where(temperature <= self._lower_bound,
+                     0.,
+                     where(temperature >= self._upper_bound,
+                           base_value,
+                           base_value * (temperature - self._lower_bound) / (self._upper_bound - self._lower_bound)))
 
     def _get_value_at_single_temperature(self, temperature):
         # value is zero for temperature bellow the lower bound
@@ -75,3 +85,17 @@ class LowTemperatureAdjustedModel(TemperatureDependenceModel):
 
         # scale the value from the base temperature model if temperature is within the upper and lower bounds.
         return base_value * (temperature - self._lower_bound) / (self._upper_bound - self._lower_bound)
+
+
+def as_temperature_array(temperature):
+    """
+    Converts array like temperatures, e.g. lists, tuples and pandas series, to numpy arrays so every model returns the
+    same type. Numpy arrays of floats, including views, are not copied. Floats are returned unchanged.
+    @param temperature: (K)
+    @return: (K), float or numpy array
+    """
+
+    if(ndim(temperature) > 0):
+        return asarray(temperature, dtype=float)
+
+    return temperature
@@ -10,6 +10,7 @@ from profit_optimisation_model.src.TemperatureDependenceModels.arrhenius_and_pea
     PeakedArrheniusModel)
 import math
 import numpy as np
+from profit_optimisation_model.src.PhotosynthesisModels.photosynthesis_model import smallest_quadratic_root
 
 
 class ElectronTransportRateModel:
@@ -30,7 +31,8 @@ class ElectronTransportRateModel:
     def electron_transport_rate(self, temperature, utilized_photosynthetically_active_radiation = None):
         """
         Calculate the electron transport rate for a given temperature and amount of utilised photosynthetically
-        active radiation
+        active radiation. Temperature and radiation can be floats or arrays that broadcast against each other, e.g. a
+        full forcing timeseries or a stack of canopy layers, and are solved in one pass.
         @param temperature: (K)
         @param utilized_photosynthetically_active_radiation: (umol m-2 unit time-1). If set to None method returns
         the maximum electron transport rate for the given temperature.
@@ -54,7 +56,7 @@ class ElectronTransportRateModel:
         # Uses numpy to calculate possible roots
         #solutions = roots([a, b, c])
 
-        return quadratic(a, b, c, large=False)
+        return smallest_quadratic_root(a, b, c)
 
         """
         # electron transport rate can only ever be positive
@@ -0,0 +1,64 @@
+"""
+-------------------------------------------------------------------------
+Checks the exact inversion of the A. Pachalis et al. (2023) xylem
+conductance for conductivity loss fractions.
+-------------------------------------------------------------------------
+"""
+
+from numpy import concatenate, full, linspace, unique
+from numpy.testing import assert_allclose
+
+from profit_optimisation_model.src.HydraulicConductanceModels.cumulative_Weibull_distribution_model import \
+    CumulativeWeibullDistribution
+from profit_optimisation_model.src.HydraulicConductanceModels.DynamicModels.A_Pachalis_conductance_model import \
+    APachalisConductanceModel
+
+
+def damaged_model():
+    conductance_model = APachalisConductanceModel(CumulativeWeibullDistribution(0.2, -2.5, 3.),
+                                                  50,
+                                                  86400.,
+                                                  growth_rate=1e-5,
+                                                  turnover_rate=0.01)
+
+    # Repeated droughts leave age groups with different conductance
+    for water_potential in concatenate((linspace(-2., -3.5, 10),
+                                        linspace(-3., -1., 20),
+                                        linspace(-1.5, -2.8, 8),
+                                        full(10, -0.5))):
+        conductance_model.update_xylem_damage(water_potential, 86400., 0., -0.2)
+
+    return conductance_model
+
+
+def test_inverse_reproduces_conductivity_loss_fractions():
+    conductance_model = damaged_model()
+    assert len(unique(conductance_model.xylem_conductivity)) > 2
+
+    loss_fraction_at_zero = 1 - conductance_model.conductance(0.) / conductance_model.maximum_conductance
+    conductivity_loss_fractions = linspace(loss_fraction_at_zero + 1e-9, 0.999, 1000)
+
+    water_potentials = conductance_model.water_potential_from_conductivity_loss_fraction(conductivity_loss_fractions)
+
+    assert_allclose(1 - conductance_model.conductance(water_potentials) / conductance_model.maximum_conductance,
+                    conductivity_loss_fractions,
+                    rtol=0., atol=1e-13)
+
+
+def test_inverse_of_healthy_model_matches_base_curve():
+    base_vulnerability_curve = CumulativeWeibullDistribution(0.2, -2.5, 3.)
+    conductance_model = APachalisConductanceModel(base_vulnerability_curve, 50, 86400.)
+    conductivity_loss_fractions = linspace(0.01, 0.99, 99)
+
+    assert_allclose(conductance_model.water_potential_from_conductivity_loss_fraction(conductivity_loss_fractions),
+                    base_vulnerability_curve.water_potential_from_conductivity_loss_fraction(
+                        conductivity_loss_fractions),
+                    rtol=1e-12)
+
+
+def test_unreachable_loss_fraction_gives_zero():
+    conductance_model = damaged_model()
+
+    loss_fraction_at_zero = 1 - conductance_model.conductance(0.) / conductance_model.maximum_conductance
+
+    assert conductance_model.water_potential_from_conductivity_loss_fraction(loss_fraction_at_zero / 2) == 0.
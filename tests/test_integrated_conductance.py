@@ -0,0 +1,68 @@
+"""
+-------------------------------------------------------------------------
+Compares the exact integrals of the vulnerability curves with numerical
+quadrature of their conductance.
+-------------------------------------------------------------------------
+"""
+
+from numpy import array, linspace
+from numpy.testing import assert_allclose
+from scipy.integrate import quad
+
+from profit_optimisation_model.src.HydraulicConductanceModels.cumulative_Weibull_distribution_model import \
+    CumulativeWeibullDistribution
+from profit_optimisation_model.src.HydraulicConductanceModels.SOX_hydraulic_conductance_model import \
+    SOXHydraulicConductanceModel
+
+
+def quad_transpiration(conductance_model, min_water_potential, max_water_potential):
+    return quad(conductance_model.conductance, min_water_potential, max_water_potential,
+                epsabs=0., epsrel=1e-13, limit=200)[0]
+
+
+def test_Weibull_transpiration_matches_quadrature():
+    for sensitivity_parameter, shape_parameter in ((-2.5, 1.5), (-3.3, 4.), (-1., 0.8), (-4., 12.)):
+        conductance_model = CumulativeWeibullDistribution(0.2, sensitivity_parameter, shape_parameter)
+
+        for min_water_potential, max_water_potential in ((-1., 0.), (-6., -0.5), (-20., -3.), (-3.1, -3.)):
+            assert_allclose(conductance_model.transpiration(min_water_potential, max_water_potential),
+                            quad_transpiration(conductance_model, min_water_potential, max_water_potential),
+                            rtol=1e-12, atol=1e-15)
+
+
+def test_Weibull_transpiration_as_a_function_of_leaf_water_potential_matches_quadrature():
+    conductance_model = CumulativeWeibullDistribution(0.2, -2.5, 3.)
+    soil_water_potential = -0.3
+    leaf_water_potentials = linspace(soil_water_potential, -5., 20)
+
+    expected = array([quad_transpiration(conductance_model, leaf_water_potential, soil_water_potential)
+                      for leaf_water_potential in leaf_water_potentials])
+
+    assert_allclose(conductance_model.transpiration_as_a_function_of_leaf_water_potential(leaf_water_potentials,
+                                                                                         soil_water_potential),
+                    expected,
+                    rtol=1e-12, atol=1e-15)
+
+
+def test_SOX_transpiration_matches_quadrature():
+    for water_potential_at_half_conductance, shape_parameter in ((-2.5, 0.7), (-3., 3.), (-1.5, 10.), (-4., 30.)):
+        conductance_model = SOXHydraulicConductanceModel(0.2, water_potential_at_half_conductance, shape_parameter)
+
+        for min_water_potential, max_water_potential in ((-1., 0.), (-6., -0.5), (-50., -3.), (-3.1, -3.)):
+            assert_allclose(conductance_model.transpiration(min_water_potential, max_water_potential),
+                            quad_transpiration(conductance_model, min_water_potential, max_water_potential),
+                            rtol=1e-12, atol=1e-15)
+
+
+def test_SOX_transpiration_as_a_function_of_leaf_water_potential_matches_quadrature():
+    conductance_model = SOXHydraulicConductanceModel(0.2, -3., 4.)
+    soil_water_potential = -0.3
+    leaf_water_potentials = linspace(soil_water_potential, -6., 20)
+
+    expected = array([quad_transpiration(conductance_model, leaf_water_potential, soil_water_potential)
+                      for leaf_water_potential in leaf_water_potentials])
+
+    assert_allclose(conductance_model.transpiration_as_a_function_of_leaf_water_potential(leaf_water_potentials,
+                                                                                         soil_water_potential),
+                    expected,
+                    rtol=1e-12, atol=1e-15)
@@ -0,0 +1,55 @@
+"""
+-------------------------------------------------------------------------
+Round trips leaf water potentials through the transpiration and its
+inverse, leaf_water_potential_from_transpiration.
+-------------------------------------------------------------------------
+"""
+
+from numpy import isnan, linspace, newaxis
+from numpy.testing import assert_allclose
+
+from profit_optimisation_model.src.HydraulicConductanceModels.cumulative_Weibull_distribution_model import \
+    CumulativeWeibullDistribution
+from profit_optimisation_model.src.HydraulicConductanceModels.SOX_hydraulic_conductance_model import \
+    SOXHydraulicConductanceModel
+from profit_optimisation_model.src.HydraulicConductanceModels.tabulated_supply_function_model import \
+    TabulatedSupplyFunctionModel
+
+
+def conductance_models():
+    return (CumulativeWeibullDistribution(0.2, -2.5, 3.),
+            SOXHydraulicConductanceModel(0.2, -3., 4.),
+            TabulatedSupplyFunctionModel(CumulativeWeibullDistribution(0.2, -2., 1.2)))
+
+
+def test_inverse_recovers_leaf_water_potentials():
+    soil_water_potential = -0.3
+    leaf_water_potentials = linspace(-0.5, -6., 1000)
+
+    for conductance_model in conductance_models():
+        transpiration_rates = conductance_model.transpiration(leaf_water_potentials, soil_water_potential)
+
+        assert_allclose(conductance_model.leaf_water_potential_from_transpiration(transpiration_rates,
+                                                                                 soil_water_potential),
+                        leaf_water_potentials,
+                        rtol=0., atol=1e-9)
+
+
+def test_inverse_broadcasts_soil_water_potentials():
+    soil_water_potentials = linspace(-0.1, -1., 4)[:, newaxis]
+    leaf_water_potentials = soil_water_potentials - linspace(0.2, 3., 5)
+
+    for conductance_model in conductance_models():
+        transpiration_rates = conductance_model.transpiration(leaf_water_potentials, soil_water_potentials)
+
+        assert_allclose(conductance_model.leaf_water_potential_from_transpiration(transpiration_rates,
+                                                                                 soil_water_potentials),
+                        leaf_water_potentials,
+                        rtol=0., atol=1e-9)
+
+
+def test_unreachable_transpiration_is_nan():
+    for conductance_model in conductance_models():
+        maximum_transpiration = conductance_model.transpiration(-2000., -0.3)
+
+        assert isnan(conductance_model.leaf_water_potential_from_transpiration(2 * maximum_transpiration, -0.3))
@@ -0,0 +1,79 @@
+"""
+-------------------------------------------------------------------------
+Compares the tabulated supply function with the exact transpiration of
+the models it wraps, including dynamic models whose table is rebuilt
+after damage.
+-------------------------------------------------------------------------
+"""
+
+from numpy import concatenate, linspace
+from numpy.testing import assert_allclose
+
+from profit_optimisation_model.src.HydraulicConductanceModels.cumulative_Weibull_distribution_model import \
+    CumulativeWeibullDistribution
+from profit_optimisation_model.src.HydraulicConductanceModels.SOX_hydraulic_conductance_model import \
+    SOXHydraulicConductanceModel
+from profit_optimisation_model.src.HydraulicConductanceModels.tabulated_supply_function_model import \
+    TabulatedSupplyFunctionModel
+from profit_optimisation_model.src.HydraulicConductanceModels.DynamicModels.Analytic_recoverable_D_S_Mackay_damage_model \
+    import analytic_recoverable_D_S_Mackay_damage_model_from_conductance_loss
+from profit_optimisation_model.src.HydraulicConductanceModels.DynamicModels.JB_xylem_impairment_model import \
+    JB_xylem_damage_model_from_conductance_loss
+
+
+def test_table_matches_exact_transpiration():
+    soil_water_potential = -0.3
+    leaf_water_potentials = linspace(soil_water_potential, -8., 500)
+
+    for conductance_model in (CumulativeWeibullDistribution(0.2, -2.5, 3.),
+                              CumulativeWeibullDistribution(0.2, -2., 1.2),
+                              SOXHydraulicConductanceModel(0.2, -3., 4.),
+                              SOXHydraulicConductanceModel(0.2, -2., 0.8)):
+        tabulated_model = TabulatedSupplyFunctionModel(conductance_model)
+
+        assert_allclose(tabulated_model.transpiration_as_a_function_of_leaf_water_potential(leaf_water_potentials,
+                                                                                           soil_water_potential),
+                        conductance_model.transpiration_as_a_function_of_leaf_water_potential(leaf_water_potentials,
+                                                                                             soil_water_potential),
+                        rtol=0., atol=1e-12)
+
+
+def test_table_is_extended_past_its_range():
+    conductance_model = CumulativeWeibullDistribution(0.2, -2.5, 3.)
+    tabulated_model = TabulatedSupplyFunctionModel(conductance_model, minimum_water_potential=-5.)
+
+    assert_allclose(tabulated_model.transpiration(-12., -0.3),
+                    conductance_model.transpiration(-12., -0.3),
+                    rtol=0., atol=1e-12)
+
+
+def test_wrapped_dynamic_models_match_unwrapped():
+    soil_water_potential = -0.2
+
+    # Dry down past the P50 and recover
+    leaf_water_potentials = concatenate((linspace(-0.5, -3.5, 30), linspace(-3.5, -0.2, 30)))
+
+    for build_model in (lambda: analytic_recoverable_D_S_Mackay_damage_model_from_conductance_loss(0.2, -3., -4.,
+                                                                                                    0.5, 0.88),
+                        lambda: JB_xylem_damage_model_from_conductance_loss(0.2, 1., -3., -4., 0.5, 0.88)):
+        conductance_model = build_model()
+        tabulated_model = TabulatedSupplyFunctionModel(build_model())
+
+        for leaf_water_potential in leaf_water_potentials:
+            transpiration_rate = conductance_model.transpiration(leaf_water_potential, soil_water_potential)
+
+            assert_allclose(tabulated_model.transpiration(leaf_water_potential, soil_water_potential),
+                            transpiration_rate,
+                            rtol=0., atol=1e-12)
+
+            model_changed = conductance_model.update_xylem_damage(leaf_water_potential,
+                                                                  1800.,
+                                                                  transpiration_rate,
+                                                                  soil_water_potential)
+
+            assert tabulated_model.update_xylem_damage(leaf_water_potential,
+                                                       1800.,
+                                                       transpiration_rate,
+                                                       soil_water_potential) == bool(model_changed)
+
+        assert_allclose(tabulated_model.maximum_conductance, conductance_model.maximum_conductance, rtol=1e-15)